@@ -1,11 +1,43 @@
-from fastapi import APIRouter, HTTPException
-from app.core.models import SearchQuery, SearchResponse
-from app.core.scraper.search_automation import ECloudSearcher
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Optional, Tuple
+from app.core.admission import AdmissionRejected
+from app.core.http_cache import (
+    FastJSONResponse,
+    cache_control,
+    compress,
+    dumps,
+    encoded_etag,
+    etag_matches,
+    strong_etag,
+)
+from app.core.metrics import collect_timings, format_server_timing, span
+from app.core.models import (
+    BatchSearchQuery,
+    BatchSearchResponse,
+    SearchQuery,
+    SearchResponse,
+    SuggestResponse,
+)
+from app.core.scraper.search_automation import ECloudSearcher, ERROR_TITLE_PREFIX
+from app.core.warmup import Warmup
+import asyncio
+import json
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 searcher = None
+# Set by the app startup hook; readiness is reported from it
+warmup: Optional[Warmup] = None
+# Attach per-stage timings to /search responses as a Server-Timing header
+SERVER_TIMING = os.getenv("ECLOUD_SERVER_TIMING", "1").lower() in ("1", "true", "yes")
+# Uncached batch items searched concurrently, and the largest accepted batch
+BATCH_CONCURRENCY = int(os.getenv("ECLOUD_BATCH_CONCURRENCY", "4"))
+BATCH_MAX_SIZE = int(os.getenv("ECLOUD_BATCH_MAX_SIZE", "500"))
+# HTTP max-age for GET /search answers that come from the local index (no result-cache TTL)
+LOCAL_ANSWER_MAX_AGE = float(os.getenv("ECLOUD_HTTP_LOCAL_MAX_AGE", "300"))
 
 def get_searcher():
     global searcher
@@ -14,11 +46,19 @@ def get_searcher():
         searcher = ECloudSearcher()
     return searcher
 
-@router.post("/search", response_model=SearchResponse)
-async def search(query: SearchQuery):
+async def _best_answer(query: str) -> Tuple[dict, Dict[str, float]]:
+    """Answer a query, mapping failures to HTTP errors (503 with Retry-After when busy)"""
     try:
-        result = await get_searcher().get_best_answer(query.query)
-        return result
+        with collect_timings() as timings:
+            result = await get_searcher().get_best_answer(query)
+        return result, timings
+    except AdmissionRejected as e:
+        logger.warning(f"Search rejected ({e.reason}): {query!r}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": e.retry_after_header}
+        )
     except ModuleNotFoundError as e:
         logger.error(f"Missing module: {str(e)}")
         raise HTTPException(
@@ -27,4 +67,187 @@ async def search(query: SearchQuery):
         )
     except Exception as e:
         logger.error(f"Search error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/search", response_model=SearchResponse, response_class=FastJSONResponse)
+async def search(query: SearchQuery, response: Response):
+    result, timings = await _best_answer(query.query)
+    if SERVER_TIMING and timings:
+        response.headers["Server-Timing"] = format_server_timing(timings)
+    return result
+
+@router.get("/search", response_model=SearchResponse)
+async def search_cacheable(q: str, request: Request):
+    """Cacheable search: strong ETag, 304 on If-None-Match, max-age from the remaining cache TTL"""
+    result, timings = await _best_answer(q)
+    body = dumps(result)
+    etag = strong_etag(body)
+    body, encoding = compress(body, etag, request.headers.get("accept-encoding"))
+
+    headers = {"Vary": "Accept-Encoding"}
+    if result["title"].startswith(ERROR_TITLE_PREFIX):
+        headers["Cache-Control"] = "no-store"
+    else:
+        freshness = get_searcher().cache_freshness(q)
+        if freshness is None:
+            # Neither the query nor a near duplicate is cached: answered from the local index,
+            # which has no per-result TTL
+            headers["Cache-Control"] = cache_control(LOCAL_ANSWER_MAX_AGE)
+        else:
+            headers["Cache-Control"] = cache_control(*freshness)
+        headers["ETag"] = encoded_etag(etag, encoding)
+
+    if "ETag" in headers and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if SERVER_TIMING and timings:
+        headers["Server-Timing"] = format_server_timing(timings)
+    return Response(body, media_type="application/json", headers=headers)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.get("/search/stream")
+async def search_stream(q: str):
+    """Server-Sent Events: status, then each scored result, then the ranked answer"""
+    current = get_searcher()
+
+    async def events():
+        try:
+            async for event, data in current.search_events(q):
+                yield _sse(event, data)
+        except AdmissionRejected as e:
+            yield _sse("error", {"detail": str(e), "retry_after": e.retry_after_header})
+        except Exception as e:
+            logger.error(f"Stream search error: {str(e)}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/suggest", response_model=SuggestResponse, response_class=FastJSONResponse)
+async def suggest(q: str, limit: Optional[int] = Query(None, ge=1, le=20)):
+    """Previously answered queries and cached result titles matching the typed prefix"""
+    current = get_searcher()
+    with span("suggest"):
+        suggestions = current.suggestions.suggest(q, limit)
+        return {
+            "query": q,
+            "suggestions": [
+                {
+                    "text": s.text,
+                    "query": s.query,
+                    "kind": s.kind,
+                    "popularity": current.suggestions.popularity(s),
+                    "cached": current.is_cached(s.query),
+                }
+                for s in suggestions
+            ],
+        }
+
+@router.post("/search/batch", response_model=BatchSearchResponse, response_class=FastJSONResponse)
+async def search_batch(batch: BatchSearchQuery):
+    if len(batch.queries) > BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(batch.queries)} queries (max {BATCH_MAX_SIZE})"
+        )
+    current = get_searcher()
+
+    # Identical questions (same cache key) are answered once
+    unique: Dict[str, str] = {}
+    for item in batch.queries:
+        unique.setdefault(current._get_cache_key(item.query), item.query)
+
+    semaphore = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+
+    async def answer(query: str) -> dict:
+        cached = current.is_cached(query)
+        try:
+            if cached:
+                # Cache hits never wait for a concurrency slot
+                result = await current.get_best_answer(query)
+            else:
+                async with semaphore:
+                    result = await current.get_best_answer(query)
+        except Exception as e:
+            logger.error(f"Batch item failed: {query!r}: {str(e)}")
+            return {"status": "error", "cached": cached, "error": str(e)}
+        if result["title"].startswith(ERROR_TITLE_PREFIX):
+            return {"status": "error", "cached": cached, "result": result, "error": result["title"]}
+        return {"status": "ok", "cached": cached, "result": result}
+
+    outcomes = dict(zip(unique, await asyncio.gather(*(answer(q) for q in unique.values()))))
+    logger.info(
+        f"Batch search: {len(batch.queries)} queries, {len(unique)} unique, "
+        f"{sum(1 for o in outcomes.values() if o['status'] == 'error')} failed"
+    )
+    return {
+        "results": [
+            {"query": item.query, **outcomes[current._get_cache_key(item.query)]}
+            for item in batch.queries
+        ]
+    }
+
+@router.get("/admin/browser-pool")
+async def browser_pool_stats():
+    return get_searcher().browser_pool.stats()
+
+@router.get("/ready")
+async def readiness(response: Response):
+    if warmup is None or not warmup.ready:
+        response.status_code = 503
+        return {"ready": False, **(warmup.status() if warmup else {})}
+    return warmup.status()
+
+@router.get("/admin/admission")
+async def admission_stats():
+    return get_searcher().admission.stats()
+
+@router.get("/admin/search-stats")
+async def search_stats():
+    return get_searcher().get_search_stats()
+
+
+@router.get("/admin/cache")
+async def cache_stats(include_keys: bool = False):
+    cache = get_searcher().cache
+    stats = cache.stats()
+    if include_keys:
+        stats["keys"] = cache.keys()
+    return stats
+
+@router.delete("/admin/cache")
+async def purge_cache(query: Optional[str] = None):
+    current = get_searcher()
+    if query is not None:
+        cache_key = current._get_cache_key(query)
+        removed = 1 if current.cache.delete(cache_key) else 0
+        current.suggestions.forget(query)
+        current.near_duplicates.remove(cache_key)
+        current.refresher.forget(cache_key)
+    else:
+        removed = current.cache.clear()
+        current.suggestions.clear()
+        current.near_duplicates.clear()
+        current.refresher.clear()
+    logger.info(f"Purged {removed} cache entries")
+    return {"removed": removed}
+
+@router.get("/admin/index")
+async def local_index_stats():
+    index = get_searcher().local_index
+    if index is None:
+        return {"loaded": False}
+    return {"loaded": True, **index.stats()}
+
+@router.post("/admin/index/reload")
+async def reload_local_index():
+    loaded = get_searcher().reload_local_index()
+    logger.info(f"Local index reloaded: {loaded}")
+    return {"loaded": loaded}
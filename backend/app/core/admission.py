@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger('ecloud_searcher')
+
+
+class AdmissionRejected(Exception):
+    """排队已满或等待超时，调用方应返回 503 并带上 Retry-After"""
+
+    def __init__(self, message: str, retry_after: float, reason: str):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class AdmissionController:
+    """限制同时进行的在线抓取数，超出部分在有界队列中按先后等待
+
+    缓存命中和本地索引作答不经过这里，因此不会排在未命中请求之后。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_queue: int = 32,
+        queue_timeout: float = 10.0,
+        min_retry_after: float = 1.0,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.min_retry_after = min_retry_after
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # 单次抓取占用时间的指数滑动平均，用于估算 Retry-After
+        self._hold_ewma = 0.0
+        self._counters = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_concurrency=int(os.getenv("ECLOUD_MAX_CONCURRENT_SEARCHES", "4")),
+            max_queue=int(os.getenv("ECLOUD_ADMISSION_QUEUE_SIZE", "32")),
+            queue_timeout=float(os.getenv("ECLOUD_ADMISSION_QUEUE_TIMEOUT", "10")),
+            min_retry_after=float(os.getenv("ECLOUD_ADMISSION_RETRY_AFTER", "1")),
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def estimate_retry_after(self) -> float:
+        """按当前排队长度和平均抓取耗时估算多久后可能有空位"""
+        backlog = self.queue_depth + 1
+        return max(self.min_retry_after, self._hold_ewma * backlog / self.max_concurrency)
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None):
+        """占用一个抓取名额；deadline 为 time.monotonic() 时间点，默认按 queue_timeout 计算"""
+        await self._acquire(deadline)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - start
+            self._hold_ewma = held if self._hold_ewma == 0.0 else 0.8 * self._hold_ewma + 0.2 * held
+            self._release()
+
+    async def _acquire(self, deadline: Optional[float]):
+        if self._active < self.max_concurrency and not self.queue_depth:
+            self._active += 1
+            self._counters["admitted"] += 1
+            return
+
+        if self.queue_depth >= self.max_queue:
+            self._counters["rejected_queue_full"] += 1
+            retry_after = self.estimate_retry_after()
+            logger.warning(f"抓取队列已满 ({self.max_queue})，拒绝请求")
+            raise AdmissionRejected("搜索繁忙，请稍后重试", retry_after, "queue_full")
+
+        if deadline is None:
+            deadline = time.monotonic() + self.queue_timeout
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._counters["queued"] += 1
+        wait_start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max(0.0, deadline - wait_start))
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # 超时与放行同时发生时，名额已经交给了本请求
+                self._record_wait(wait_start)
+                self._counters["admitted"] += 1
+                return
+            waiter.cancel()
+            self._counters["rejected_timeout"] += 1
+            logger.warning(f"抓取排队超时 ({time.monotonic() - wait_start:.1f}秒)，拒绝请求")
+            raise AdmissionRejected("搜索排队超时，请稍后重试", self.estimate_retry_after(), "timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        self._record_wait(wait_start)
+        self._counters["admitted"] += 1
+
+    def _record_wait(self, wait_start: float):
+        waited = time.monotonic() - wait_start
+        self._counters["queue_wait_total"] += waited
+        self._counters["queue_wait_max"] = max(self._counters["queue_wait_max"], waited)
+
+    def _release(self):
+        # 名额直接交给队首仍在等待的请求，active 计数不变
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        queued = self._counters["queued"]
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "admitted": self._counters["admitted"],
+            "queued": queued,
+            "rejected_queue_full": self._counters["rejected_queue_full"],
+            "rejected_timeout": self._counters["rejected_timeout"],
+            "queue_wait_avg_ms": (
+                self._counters["queue_wait_total"] / queued * 1000 if queued else 0.0
+            ),
+            "queue_wait_max_ms": self._counters["queue_wait_max"] * 1000,
+            "hold_avg_ms": self._hold_ewma * 1000,
+            "retry_after": self.estimate_retry_after(),
+        }
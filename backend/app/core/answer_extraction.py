@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from cachetools import LRUCache
+
+from app.core.indexer import parse_article_html
+from app.core.metrics import span
+from app.core.models import SearchResult
+from app.core.scoring import BatchScorer
+
+logger = logging.getLogger('ecloud_searcher')
+
+# 短于该长度的行（多为小标题）并入下一段，保留上下文
+MIN_PARAGRAPH_CHARS = 30
+# 过长的段落按该长度切开，避免整页正文作为一个"段落"
+MAX_PARAGRAPH_CHARS = 800
+
+
+def split_paragraphs(body: str) -> List[str]:
+    """把按块级元素分行的正文切成段落"""
+    paragraphs: List[str] = []
+    pending = ""
+    for line in body.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        text = f"{pending}\n{line}" if pending else line
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            pending = text
+            continue
+        pending = ""
+        while len(text) > MAX_PARAGRAPH_CHARS:
+            paragraphs.append(text[:MAX_PARAGRAPH_CHARS])
+            text = text[MAX_PARAGRAPH_CHARS:]
+        paragraphs.append(text)
+    if pending:
+        paragraphs.append(pending)
+    return paragraphs
+
+
+@dataclass
+class CachedArticle:
+    url: str
+    title: str
+    paragraphs: List[str] = field(default_factory=list)
+    etag: str = ""
+    last_modified: str = ""
+    checked_at: float = 0.0
+
+
+class ArticleFetcher:
+    """按 URL 缓存文章正文，过了复验间隔后用 ETag/Last-Modified 做条件请求
+
+    已缓存的文章到期后先返回旧内容，复验在后台进行，不占用请求的时间；
+    同一 URL 的并发抓取只发出一次请求。
+    """
+
+    def __init__(
+        self,
+        allowed_hosts: Optional[Iterable[str]] = None,
+        max_articles: int = 500,
+        revalidate_after: float = 600.0,
+        timeout: float = 5.0,
+        max_connections: int = 10,
+    ):
+        self.allowed_hosts = {host.lower() for host in (allowed_hosts or []) if host}
+        self.revalidate_after = revalidate_after
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._articles: LRUCache = LRUCache(maxsize=max_articles)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stats = {
+            "hits": 0,
+            "revalidated": 0,
+            "stale_served": 0,
+            "fetched": 0,
+            "errors": 0,
+        }
+
+    @classmethod
+    def from_env(cls, allowed_hosts: Optional[Iterable[str]] = None) -> "ArticleFetcher":
+        return cls(
+            allowed_hosts=allowed_hosts,
+            max_articles=int(os.getenv("ECLOUD_ARTICLE_CACHE_SIZE", "500")),
+            revalidate_after=float(os.getenv("ECLOUD_ARTICLE_REVALIDATE_AFTER", "600")),
+            timeout=float(os.getenv("ECLOUD_ARTICLE_TIMEOUT", "5")),
+        )
+
+    def can_fetch(self, url: str) -> bool:
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https"):
+            return False
+        return not self.allowed_hosts or (parsed.hostname or "").lower() in self.allowed_hosts
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def get(self, url: str) -> Optional[CachedArticle]:
+        cached = self._articles.get(url)
+        if cached is not None and time.time() - cached.checked_at < self.revalidate_after:
+            self._stats["hits"] += 1
+            return cached
+
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.create_task(self._fetch(url, cached))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        if cached is not None:
+            # 旧内容仍可用，复验在后台完成
+            self._stats["stale_served"] += 1
+            return cached
+        # shield：调用方超时不会取消抓取，文章仍会写入缓存供下次使用
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str, cached: Optional[CachedArticle]) -> Optional[CachedArticle]:
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        try:
+            response = await self._get_client().get(url, headers=headers)
+            if response.status_code == 304 and cached is not None:
+                self._stats["revalidated"] += 1
+                cached.checked_at = time.time()
+                return cached
+            response.raise_for_status()
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"抓取文章失败 {url}: {str(e)}")
+            # 复验失败时继续使用旧内容
+            return cached
+
+        title, body = parse_article_html(response.text)
+        article = CachedArticle(
+            url=url,
+            title=title,
+            paragraphs=split_paragraphs(body),
+            etag=response.headers.get("etag", ""),
+            last_modified=response.headers.get("last-modified", ""),
+            checked_at=time.time(),
+        )
+        self._articles[url] = article
+        self._stats["fetched"] += 1
+        logger.debug("文章已缓存: %s (%d 段)", url, len(article.paragraphs))
+        return article
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            **self._stats,
+            "articles": len(self._articles),
+            "max_articles": self._articles.maxsize,
+            "revalidate_after": self.revalidate_after,
+        }
+
+    async def close(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class AnswerExtractor:
+    """排序之后的阶段：并发打开前 top_k 篇文章，取与查询最匹配的段落作为答案"""
+
+    def __init__(self, fetcher: ArticleFetcher, top_k: int = 3):
+        self.fetcher = fetcher
+        self.top_k = top_k
+        self._stats = {"budget_skipped": 0, "budget_timeouts": 0}
+
+    @classmethod
+    def from_env(cls, allowed_hosts: Optional[Iterable[str]] = None) -> "AnswerExtractor":
+        return cls(
+            ArticleFetcher.from_env(allowed_hosts),
+            top_k=int(os.getenv("ECLOUD_ANSWER_TOP_K", "3")),
+        )
+
+    async def best_paragraph(
+        self, query: str, results: List[SearchResult]
+    ) -> Optional[Tuple[int, str, float]]:
+        """返回 (结果下标, 段落, 段落得分)，没有可用文章时返回 None"""
+        candidates = [
+            (index, result) for index, result in enumerate(results[:self.top_k])
+            if result.url and self.fetcher.can_fetch(result.url)
+        ]
+        if not candidates:
+            return None
+
+        articles = await asyncio.gather(
+            *(self.fetcher.get(result.url) for _, result in candidates)
+        )
+        scorer = BatchScorer(query)
+        best: Optional[Tuple[int, str, float]] = None
+        for (index, _), article in zip(candidates, articles):
+            if article is None:
+                continue
+            for paragraph in article.paragraphs:
+                score = scorer.score(paragraph)
+                if best is None or score > best[2]:
+                    best = (index, paragraph, score)
+        return best
+
+    async def apply(
+        self, query: str, results: List[SearchResult], deadline: Optional[float] = None
+    ) -> List[SearchResult]:
+        """用最佳段落替换对应结果的摘要并把它放到首位，返回新列表，不修改缓存中的结果
+
+        deadline 为请求的 time.monotonic() 截止时间；到时仍未取到文章则直接返回排序结果。
+        """
+        if self.top_k <= 0 or not results:
+            return results
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            self._stats["budget_skipped"] += 1
+            return results
+        with span("answer_extraction"):
+            try:
+                best = await asyncio.wait_for(self.best_paragraph(query, results), remaining)
+            except asyncio.TimeoutError:
+                self._stats["budget_timeouts"] += 1
+                logger.warning(f"段落级答案提取超出请求预算，使用搜索摘要: {query}")
+                return results
+            except Exception as e:
+                logger.warning(f"段落级答案提取失败，使用搜索摘要: {str(e)}")
+                return results
+        if best is None:
+            return results
+
+        index, paragraph, score = best
+        logger.debug("最佳段落来自第 %d 个结果，段落得分: %.4f", index + 1, score)
+        answer = replace(results[index], content=paragraph)
+        return [answer] + [result for i, result in enumerate(results) if i != index]
+
+    def stats(self) -> Dict[str, object]:
+        return {"top_k": self.top_k, **self._stats, **self.fetcher.stats()}
+
+    async def close(self):
+        await self.fetcher.close()
@@ -0,0 +1,450 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cachetools import LRUCache
+
+logger = logging.getLogger('ecloud_searcher')
+
+# 开启共享缓存但未指定 ECLOUD_CACHE_DISK_PATH 时使用的数据库路径
+DEFAULT_SHARED_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "cache", "results.db"
+)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float
+    ttl: float
+    size: int = 0
+    stale_ttl: float = 0.0
+
+    @property
+    def expires_at(self) -> float:
+        return self.stored_at + self.ttl
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) < self.expires_at
+
+    def is_servable(self, now: Optional[float] = None) -> bool:
+        """过期后仍在陈旧窗口内，可先返回再后台刷新"""
+        return (now or time.time()) < self.expires_at + self.stale_ttl
+
+
+class _MemoryTier(LRUCache):
+    """按字节数限制容量的 LRU，淘汰时回调统计"""
+
+    def __init__(self, max_bytes: int, on_evict: Callable[[str, CacheEntry], None]):
+        super().__init__(maxsize=max_bytes, getsizeof=lambda entry: entry.size)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        key, entry = super().popitem()
+        self._on_evict(key, entry)
+        return key, entry
+
+
+class _DiskTier:
+    """基于 SQLite 的持久化缓存层，进程重启后仍可命中
+
+    shared 模式下使用 WAL 日志，供同一主机上的多个 worker 进程同时读写，
+    并提供跨进程的抓取占用标记（claims 表）。这些调用运行在事件循环上，
+    初始化之后锁等待只有 busy_timeout 秒，超时抛出 sqlite3.OperationalError，由调用方按未命中处理。
+    """
+
+    EVICT_EVERY = 100
+    # 访问时间的更新间隔，避免每次读取都产生一次写事务
+    TOUCH_INTERVAL = 60.0
+
+    def __init__(self, path: str, max_entries: int, shared: bool = False, busy_timeout: float = 0.05):
+        self.path = path
+        self.max_entries = max_entries
+        self.shared = shared
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+        if shared:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS claims (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)"
+            )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, stored_at REAL, ttl REAL, payload TEXT, accessed_at REAL, "
+            "stale_ttl REAL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if "stale_ttl" not in columns:
+            self._conn.execute("ALTER TABLE results ADD COLUMN stale_ttl REAL DEFAULT 0")
+        self._conn.commit()
+        # 建表时可以多等一会儿，之后的读写不能长时间阻塞事件循环
+        self._conn.execute(f"PRAGMA busy_timeout = {max(0, int(busy_timeout * 1000))}")
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[tuple]:
+        """返回仍在陈旧窗口内的记录，过期判断在 SQL 中完成"""
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT stored_at, ttl, payload, stale_ttl, accessed_at FROM results "
+            "WHERE key = ? AND stored_at + ttl + stale_ttl >= ?",
+            (key, now),
+        ).fetchone()
+        if row is None:
+            return None
+        if (row[4] or 0) < now - self.TOUCH_INTERVAL:
+            # 访问时间只影响淘汰顺序，数据库忙时跳过
+            try:
+                self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            except sqlite3.OperationalError:
+                self.rollback()
+        return row[:4]
+
+    def set(self, key: str, stored_at: float, ttl: float, payload: str, stale_ttl: float = 0.0) -> int:
+        """写入一条记录，返回本次顺带淘汰的条数；不会覆盖其他进程写入的更新记录"""
+        self._conn.execute(
+            "INSERT INTO results (key, stored_at, ttl, payload, accessed_at, stale_ttl) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET stored_at = excluded.stored_at, ttl = excluded.ttl, "
+            "payload = excluded.payload, accessed_at = excluded.accessed_at, "
+            "stale_ttl = excluded.stale_ttl "
+            "WHERE excluded.stored_at >= results.stored_at",
+            (key, stored_at, ttl, payload, time.time(), stale_ttl),
+        )
+        self._conn.commit()
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            return self.evict()
+        return 0
+
+    def delete(self, key: str):
+        self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def meta(self, key: str) -> Optional[tuple]:
+        """只读出 (stored_at, ttl)，不读 payload、不更新访问时间"""
+        return self._conn.execute(
+            "SELECT stored_at, ttl FROM results WHERE key = ?", (key,)
+        ).fetchone()
+
+    def delete_older(self, key: str, stored_before: float, now: float):
+        """删除不晚于 stored_before 写入或已超出陈旧窗口的记录，其他进程之后写入的新记录保留"""
+        self._conn.execute(
+            "DELETE FROM results WHERE key = ? AND (stored_at <= ? OR stored_at + ttl + stale_ttl < ?)",
+            (key, stored_before, now),
+        )
+        self._conn.commit()
+
+    def delete_expired(self, key: str, now: float):
+        """只删除已超出陈旧窗口的记录，不会误删其他进程刚写入的新记录"""
+        self._conn.execute(
+            "DELETE FROM results WHERE key = ? AND stored_at + ttl + stale_ttl < ?", (key, now)
+        )
+        self._conn.commit()
+
+    def try_claim(self, key: str, owner: str, ttl: float) -> bool:
+        """原子地占用一个键：没有占用或占用已过期时成功"""
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT INTO claims (key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE claims.expires_at < ? OR claims.owner = excluded.owner",
+            (key, owner, now + ttl, now),
+        )
+        self._conn.commit()
+        return cursor.rowcount == 1
+
+    def release_claim(self, key: str, owner: str):
+        self._conn.execute("DELETE FROM claims WHERE key = ? AND owner = ?", (key, owner))
+        self._conn.commit()
+
+    def is_claimed(self, key: str) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM claims WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def evict(self) -> int:
+        """删除超出陈旧窗口的记录以及超出容量的最久未访问记录"""
+        cursor = self._conn.execute(
+            "DELETE FROM results WHERE stored_at + ttl + stale_ttl < ?", (time.time(),)
+        )
+        removed = cursor.rowcount
+        cursor = self._conn.execute(
+            "DELETE FROM results WHERE key IN ("
+            "SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        removed += cursor.rowcount
+        if self.shared:
+            self._conn.execute("DELETE FROM claims WHERE expires_at < ?", (time.time(),))
+        self._conn.commit()
+        return removed
+
+    def clear(self) -> int:
+        cursor = self._conn.execute("DELETE FROM results")
+        self._conn.commit()
+        return cursor.rowcount
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def rollback(self):
+        """放弃锁等待超时后残留的隐式事务"""
+        try:
+            self._conn.rollback()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        self._conn.close()
+
+
+class ResultCache:
+    """两级搜索结果缓存：内存 LRU（按条数和字节数限制）+ 可选的磁盘层
+
+    shared=True 时磁盘层由同一主机上的多个 worker 进程共享：本进程内存中的条目过期后
+    会先查看磁盘层是否已有其他进程刷新的结果，抓取前通过 try_claim 避免重复抓取。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        default_ttl: float = 24 * 3600,
+        stale_ttl: float = 0.0,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 10000,
+        shared: bool = False,
+        busy_timeout: float = 0.05,
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda value: value,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self._encode = encode
+        self._decode = decode
+        self._lock = threading.RLock()
+        self._memory = _MemoryTier(max_bytes, self._on_memory_evict)
+        self._disk = (
+            _DiskTier(disk_path, disk_max_entries, shared, busy_timeout) if disk_path else None
+        )
+        self.shared = shared and self._disk is not None
+        # 跨进程占用标记的持有者标识
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "expirations": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "peer_refreshes": 0,
+            "claims_acquired": 0,
+            "claims_busy": 0,
+            "disk_busy": 0,
+        }
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "ResultCache":
+        """从环境变量读取缓存容量和磁盘层配置"""
+        shared = os.getenv("ECLOUD_CACHE_SHARED", "0").lower() in ("1", "true", "yes")
+        disk_path = os.getenv("ECLOUD_CACHE_DISK_PATH") or None
+        if shared and disk_path is None:
+            disk_path = DEFAULT_SHARED_PATH
+        return cls(
+            max_entries=int(os.getenv("ECLOUD_CACHE_MAX_ENTRIES", "1000")),
+            max_bytes=int(os.getenv("ECLOUD_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            disk_path=disk_path,
+            disk_max_entries=int(os.getenv("ECLOUD_CACHE_DISK_MAX_ENTRIES", "10000")),
+            shared=shared,
+            busy_timeout=float(os.getenv("ECLOUD_CACHE_BUSY_TIMEOUT", "0.05")),
+            **kwargs,
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        """返回未过期的缓存值，未命中或已过期返回 None"""
+        entry = self._lookup(key, allow_stale=False)
+        return entry.value if entry is not None else None
+
+    def get_entry(self, key: str, record_stats: bool = True) -> Optional[CacheEntry]:
+        """返回仍在陈旧窗口内的条目（可能已过期），由调用方决定是否刷新"""
+        return self._lookup(key, allow_stale=True, record_stats=record_stats)
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+    ) -> CacheEntry:
+        """写入并返回新条目"""
+        with self._lock:
+            ttl = self.default_ttl if ttl is None else ttl
+            stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+            payload = json.dumps(self._encode(value), ensure_ascii=False)
+            entry = CacheEntry(
+                value, time.time(), ttl, len(payload.encode("utf-8")), stale_ttl
+            )
+            self._stats["sets"] += 1
+            self._put_memory(key, entry)
+            if self._disk is not None:
+                self._stats["disk_evictions"] += self._try_disk(
+                    0, self._disk.set, key, entry.stored_at, entry.ttl, payload, entry.stale_ttl
+                )
+            return entry
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            found = self._memory.pop(key, None) is not None
+            if self._disk is not None:
+                self._try_disk(None, self._disk.delete, key)
+            return found
+
+    def evict_local(self, key: str, stored_before: float) -> bool:
+        """清出本进程内存层中的条目；磁盘层只删除不晚于 stored_before 写入或已过期的记录
+
+        共享模式下其他进程可能已经写入了更新的结果，不能像 delete() 那样无条件删除。
+        """
+        with self._lock:
+            found = self._memory.pop(key, None) is not None
+            if self._disk is not None:
+                self._try_disk(None, self._disk.delete_older, key, stored_before, time.time())
+            return found
+
+    def shared_meta(self, key: str) -> Optional[Tuple[float, float]]:
+        """共享磁盘层中该键的 (stored_at, ttl)，用于判断其他进程是否已刷新；非共享模式返回 None"""
+        if not self.shared:
+            return None
+        with self._lock:
+            return self._try_disk(None, self._disk.meta, key)
+
+    def clear(self) -> int:
+        """清空所有层，返回内存层被清除的条数"""
+        with self._lock:
+            removed = len(self._memory)
+            self._memory.clear()
+            if self._disk is not None:
+                self._try_disk(0, self._disk.clear)
+            return removed
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._memory.keys())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = (
+                self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["stale_hits"]
+            )
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "entries": len(self._memory),
+                "bytes": self._memory.currsize,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "disk_enabled": self._disk is not None,
+                "shared": self.shared,
+                "disk_entries": self._try_disk(0, self._disk.count) if self._disk is not None else 0,
+            }
+
+    def try_claim(self, key: str, ttl: float) -> bool:
+        """跨进程占用一个键的抓取权；非共享模式下总是成功"""
+        if not self.shared:
+            return True
+        with self._lock:
+            # 数据库忙时按占用成功处理：最多重复抓取一次，好过让请求等待
+            acquired = self._try_disk(True, self._disk.try_claim, key, self._owner, ttl)
+            self._stats["claims_acquired" if acquired else "claims_busy"] += 1
+            return acquired
+
+    def release_claim(self, key: str):
+        if self.shared:
+            with self._lock:
+                # 释放失败时占用标记会在 claim TTL 后自然过期
+                self._try_disk(None, self._disk.release_claim, key, self._owner)
+
+    def is_claimed(self, key: str) -> bool:
+        """是否有其他进程正在抓取该键"""
+        if not self.shared:
+            return False
+        with self._lock:
+            return self._try_disk(False, self._disk.is_claimed, key)
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+
+    def _try_disk(self, default: Any, method: Callable[..., Any], *args) -> Any:
+        """调用磁盘层；锁等待超过 busy_timeout 等错误时返回 default，按未命中或跳过处理"""
+        try:
+            return method(*args)
+        except sqlite3.OperationalError as e:
+            self._stats["disk_busy"] += 1
+            self._disk.rollback()
+            logger.debug("磁盘缓存暂不可用，跳过: %s", e)
+            return default
+
+    def _lookup(self, key: str, allow_stale: bool, record_stats: bool = True) -> Optional[CacheEntry]:
+        stats = self._stats if record_stats else dict.fromkeys(self._stats, 0)
+        with self._lock:
+            now = time.time()
+            entry = self._memory.get(key)
+            tier = "memory_hits"
+            # 共享模式下本地条目已过期时，其他进程可能已经刷新了磁盘层
+            check_disk = entry is None or (self.shared and not entry.is_fresh(now))
+            if check_disk and self._disk is not None:
+                row = self._try_disk(None, self._disk.get, key)
+                if row is not None and (entry is None or row[0] > entry.stored_at):
+                    stored_at, ttl, payload, stale_ttl = row
+                    if entry is not None:
+                        stats["peer_refreshes"] += 1
+                    entry = CacheEntry(
+                        self._decode(json.loads(payload)), stored_at, ttl,
+                        len(payload.encode("utf-8")), stale_ttl or 0.0,
+                    )
+                    tier = "disk_hits"
+                    if entry.is_servable(now):
+                        self._put_memory(key, entry)
+
+            if entry is not None and not entry.is_servable(now):
+                stats["expirations"] += 1
+                self._memory.pop(key, None)
+                if self._disk is not None:
+                    self._try_disk(None, self._disk.delete_expired, key, now)
+                entry = None
+
+            if entry is not None and entry.is_fresh(now):
+                stats[tier] += 1
+                return entry
+            if entry is not None and allow_stale:
+                stats["stale_hits"] += 1
+                return entry
+            stats["misses"] += 1
+            return None
+
+    def _put_memory(self, key: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            logger.debug("缓存条目过大，跳过内存层: %s (%d 字节)", key, entry.size)
+            self._memory.pop(key, None)
+            return
+        self._memory[key] = entry
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem()
+
+    def _on_memory_evict(self, key: str, entry: CacheEntry):
+        self._stats["memory_evictions"] += 1
@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Iterable, Optional, Tuple
+
+from cachetools import LRUCache
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # 未安装时退回标准库
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 小于该字节数的响应不压缩，压缩头的开销可能大于收益
+COMPRESS_MIN_SIZE = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# 同一结果的压缩体按 (ETag, 编码) 复用，重复请求不再重复压缩
+_encoded_bodies: LRUCache = LRUCache(maxsize=256)
+
+
+def dumps(value: Any) -> bytes:
+    """序列化为 UTF-8 JSON，安装了 orjson 时使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """用 dumps() 渲染的 JSONResponse，可作为路由的 response_class"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def strong_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """不同内容编码是不同的表示，强 ETag 需要区分"""
+    if not encoding:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 使用弱比较；同一内容任意编码的 ETag 都视为匹配"""
+    if not if_none_match:
+        return False
+    candidates = {etag, encoded_etag(etag, "gzip"), encoded_etag(etag, "br")}
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in candidates:
+            return True
+    return False
+
+
+def _accepted(accept_encoding: Optional[str]) -> Iterable[str]:
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        yield coding
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """按服务端偏好选择编码：brotli（已安装时）优先，其次 gzip"""
+    accepted = set(_accepted(accept_encoding))
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, etag: str, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """返回 (响应体, Content-Encoding)，太小或客户端不支持时原样返回"""
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None or len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+    key = (etag, encoding)
+    encoded = _encoded_bodies.get(key)
+    if encoded is None:
+        if encoding == "br":
+            encoded = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            encoded = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        _encoded_bodies[key] = encoded
+    return encoded, encoding
+
+
+def cache_control(max_age: float, stale: float = 0.0) -> str:
+    """按缓存剩余时间生成 Cache-Control；已过期仍可返回的结果设 max-age=0 并给出陈旧窗口"""
+    value = f"public, max-age={max(0, int(max_age))}"
+    if stale > 0:
+        value += f", stale-while-revalidate={int(stale)}"
+    return value
@@ -0,0 +1,471 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import shutil
+import time
+from collections import Counter
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from app.core.models import SearchResult
+from app.core.scoring import is_cjk, tokenize
+
+logger = logging.getLogger('ecloud_searcher')
+
+INDEX_VERSION = 2
+# 标题中的词项按该倍数计入词频
+TITLE_BOOST = 3
+SNIPPET_CHARS = 300
+DEFAULT_INDEX_DIR = os.getenv("ECLOUD_INDEX_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "index"
+)
+
+_MANIFEST = "manifest.json"
+_LEXICON = "lexicon.json"
+_POSTINGS = "postings.bin"
+_DOCS = "docs.bin"
+_DOC_TERMS = "doc_terms.json"
+
+
+def index_terms(text: str) -> Counter:
+    """索引词项：中文按单字和 bi-gram 切分，英文/数字按整词
+
+    查询和文档使用同一切分，单字查询词（如"盘"）也能命中较长的中文片段；
+    单字出现在大量文章中，BM25 的 idf 会自然压低其权重。
+    """
+    terms = Counter()
+    for token in tokenize(text.lower()):
+        if is_cjk(token):
+            terms.update(token)
+            terms.update(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            terms[token] += 1
+    return terms
+
+
+@dataclass
+class Article:
+    id: str
+    url: str
+    title: str
+    body: str
+    hash: str = ""
+    etag: str = ""
+    last_modified: str = ""
+
+    def __post_init__(self):
+        if not self.hash:
+            self.hash = hashlib.sha1(f"{self.title}\n{self.body}".encode("utf-8")).hexdigest()
+
+
+class _ArticleHTMLParser(HTMLParser):
+    """提取文章页的标题和正文文本，忽略脚本和样式"""
+
+    _SKIP = {"script", "style", "noscript", "template", "svg"}
+    _BLOCK = {"p", "div", "li", "br", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article"}
+
+    def __init__(self):
+        super().__init__()
+        self.title = ""
+        self.h1 = ""
+        self._parts: List[str] = []
+        self._skip_depth = 0
+        self._in_title = False
+        self._in_h1 = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "h1":
+            self._in_h1 = True
+        if tag in self._BLOCK:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag == "h1":
+            self._in_h1 = False
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._in_title:
+            self.title += data
+            return
+        if self._in_h1:
+            self.h1 += data
+        self._parts.append(data)
+
+    @property
+    def body(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self._parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def parse_article_html(html_text: str) -> Tuple[str, str]:
+    """返回文章页的 (标题, 正文)，正文按块级元素分行"""
+    parser = _ArticleHTMLParser()
+    parser.feed(html_text)
+    return (parser.h1 or parser.title).strip(), parser.body
+
+
+class ArticleCrawler:
+    """并发抓取 doc/article/<id> 页面，支持 ETag/Last-Modified 条件请求"""
+
+    def __init__(self, doc_article_url: str, concurrency: int = 8, timeout: float = 15.0, render=None):
+        self.doc_article_url = doc_article_url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # 可选的渲染函数 async (url) -> html，用于正文由前端渲染的页面
+        self.render = render
+
+    async def crawl(
+        self, ids: Iterable[str], previous: Dict[str, dict]
+    ) -> Dict[str, Tuple[str, Optional[Article]]]:
+        """返回 {id: (状态, Article)}，状态为 new/changed/unchanged/missing/error"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: Dict[str, Tuple[str, Optional[Article]]] = {}
+
+        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=True) as client:
+            async def worker(article_id: str):
+                async with semaphore:
+                    results[article_id] = await self._fetch(client, article_id, previous.get(article_id))
+
+            await asyncio.gather(*(worker(str(article_id)) for article_id in ids))
+        return results
+
+    async def _fetch(self, client: httpx.AsyncClient, article_id: str, previous: Optional[dict]):
+        url = f"{self.doc_article_url}{article_id}"
+        headers = {}
+        if previous and self.render is None:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+        try:
+            if self.render is not None:
+                html_text, etag, last_modified = await self.render(url), "", ""
+            else:
+                response = await client.get(url, headers=headers)
+                if response.status_code == 304:
+                    return "unchanged", None
+                if response.status_code == 404:
+                    return "missing", None
+                response.raise_for_status()
+                html_text = response.text
+                etag = response.headers.get("etag", "")
+                last_modified = response.headers.get("last-modified", "")
+        except Exception as e:
+            logger.warning(f"抓取文章 {article_id} 失败: {str(e)}")
+            return "error", None
+
+        title, body = parse_article_html(html_text)
+        if not title and not body:
+            return "missing", None
+
+        article = Article(article_id, url, title, body, etag=etag, last_modified=last_modified)
+        if previous is None:
+            return "new", article
+        if previous.get("hash") == article.hash:
+            return "unchanged", article
+        return "changed", article
+
+
+class IndexBuilder:
+    """构建/增量刷新磁盘倒排索引，只对内容哈希变化的文章重新分词"""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+
+    def _load_previous(self) -> Tuple[Dict[str, dict], Dict[str, Dict[str, int]], Dict[str, str]]:
+        manifest_path = os.path.join(self.index_dir, _MANIFEST)
+        if not os.path.exists(manifest_path):
+            return {}, {}, {}
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != INDEX_VERSION:
+            # 词项切分已变化，旧索引的词频不能复用，全部重新抓取和分词
+            logger.info(f"索引版本 {manifest.get('version')} 已过期，将完整重建")
+            return {}, {}, {}
+        with open(os.path.join(self.index_dir, _DOC_TERMS), encoding="utf-8") as f:
+            doc_terms = json.load(f)
+        bodies = {}
+        with open(os.path.join(self.index_dir, _DOCS), "rb") as f:
+            data = f.read()
+        for article in manifest["articles"]:
+            bodies[article["id"]] = data[article["offset"]:article["offset"] + article["size"]].decode("utf-8")
+        return {a["id"]: a for a in manifest["articles"]}, doc_terms, bodies
+
+    async def refresh(self, ids: Iterable[str], crawler: ArticleCrawler) -> Dict[str, int]:
+        """抓取指定文章并重建索引；未在本次抓取范围内的文章原样保留"""
+        previous, doc_terms, bodies = self._load_previous()
+        crawled = await crawler.crawl(ids, previous)
+
+        stats = Counter(status for status, _ in crawled.values())
+        articles = dict(previous)
+        for article_id, (status, article) in crawled.items():
+            if status == "missing":
+                articles.pop(article_id, None)
+                doc_terms.pop(article_id, None)
+                bodies.pop(article_id, None)
+            elif status in ("new", "changed"):
+                articles[article_id] = {
+                    "id": article.id,
+                    "url": article.url,
+                    "title": article.title,
+                    "hash": article.hash,
+                    "etag": article.etag,
+                    "last_modified": article.last_modified,
+                }
+                bodies[article_id] = article.body
+                terms = index_terms(article.body)
+                for term, count in index_terms(article.title).items():
+                    terms[term] += count * TITLE_BOOST
+                doc_terms[article_id] = dict(terms)
+            elif status == "unchanged" and article is not None and article_id in articles:
+                # 内容未变但服务器未返回 304，更新校验头以便下次条件请求
+                articles[article_id]["etag"] = article.etag
+                articles[article_id]["last_modified"] = article.last_modified
+
+        self.write(list(articles.values()), bodies, doc_terms)
+        logger.info(f"索引刷新完成: {dict(stats)}，文章总数 {len(articles)}")
+        return {**stats, "total": len(articles)}
+
+    def write(self, articles: List[dict], bodies: Dict[str, str], doc_terms: Dict[str, Dict[str, int]]):
+        """写入新索引目录后整体替换，已映射旧文件的进程不受影响"""
+        tmp_dir = f"{self.index_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        articles = sorted(articles, key=lambda a: a["id"])
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        offset = 0
+        with open(os.path.join(tmp_dir, _DOCS), "wb") as f:
+            for index, article in enumerate(articles):
+                data = bodies.get(article["id"], "").encode("utf-8")
+                f.write(data)
+                article["offset"], article["size"] = offset, len(data)
+                offset += len(data)
+                terms = doc_terms.get(article["id"], {})
+                article["length"] = sum(terms.values())
+                for term, tf in terms.items():
+                    postings.setdefault(term, []).append((index, tf))
+
+        lexicon = {}
+        blocks = []
+        position = 0
+        for term in sorted(postings):
+            entries = postings[term]
+            lexicon[term] = [position, len(entries)]
+            blocks.extend(entries)
+            position += len(entries)
+        np.asarray(blocks or [(0, 0)], dtype=np.uint32).tofile(os.path.join(tmp_dir, _POSTINGS))
+
+        lengths = [a["length"] for a in articles]
+        manifest = {
+            "version": INDEX_VERSION,
+            "built_at": time.time(),
+            "doc_count": len(articles),
+            "avg_length": (sum(lengths) / len(lengths)) if lengths else 0.0,
+            "articles": articles,
+        }
+        for name, payload in ((_MANIFEST, manifest), (_LEXICON, lexicon), (_DOC_TERMS, doc_terms)):
+            with open(os.path.join(tmp_dir, name), "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+
+        old_dir = f"{self.index_dir}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(self.index_dir):
+            os.replace(self.index_dir, old_dir)
+        os.replace(tmp_dir, self.index_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+class LocalIndex:
+    """内存映射的本地倒排索引，BM25 检索帮助中心文章"""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, _MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != INDEX_VERSION:
+            raise ValueError(f"索引版本不兼容: {manifest.get('version')}")
+        with open(os.path.join(index_dir, _LEXICON), encoding="utf-8") as f:
+            self._lexicon: Dict[str, List[int]] = json.load(f)
+
+        self.articles: List[dict] = manifest["articles"]
+        self.built_at = manifest["built_at"]
+        self.doc_count = manifest["doc_count"]
+        self.avg_length = manifest["avg_length"] or 1.0
+        self._lengths = np.asarray([a["length"] for a in self.articles], dtype=np.float32)
+        self._postings = np.memmap(
+            os.path.join(index_dir, _POSTINGS), dtype=np.uint32, mode="r"
+        ).reshape(-1, 2)
+        self._docs_file = open(os.path.join(index_dir, _DOCS), "rb")
+        self._docs = (
+            mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if os.path.getsize(os.path.join(index_dir, _DOCS)) else b""
+        )
+
+    @classmethod
+    def load(cls, index_dir: Optional[str]) -> Optional["LocalIndex"]:
+        """索引目录不存在或不可用时返回 None"""
+        if not index_dir or not os.path.exists(os.path.join(index_dir, _MANIFEST)):
+            return None
+        try:
+            index = cls(index_dir)
+        except Exception as e:
+            logger.error(f"加载本地索引失败: {str(e)}", exc_info=True)
+            return None
+        logger.info(f"已加载本地索引: {index.doc_count} 篇文章")
+        return index
+
+    def body(self, doc: int) -> str:
+        article = self.articles[doc]
+        return self._docs[article["offset"]:article["offset"] + article["size"]].decode("utf-8")
+
+    def search(self, query: str, limit: int = 10) -> List[SearchResult]:
+        """BM25 召回，返回带正文片段的结果（未经 BatchScorer 打分）"""
+        if not self.doc_count:
+            return []
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        for term, query_tf in index_terms(query).items():
+            entry = self._lexicon.get(term)
+            if entry is None:
+                continue
+            offset, count = entry
+            block = self._postings[offset:offset + count]
+            docs = block[:, 0]
+            tf = block[:, 1].astype(np.float32)
+            idf = math.log(1 + (self.doc_count - count + 0.5) / (count + 0.5))
+            norm = self.K1 * (1 - self.B + self.B * self._lengths[docs] / self.avg_length)
+            scores[docs] += query_tf * idf * tf * (self.K1 + 1) / (tf + norm)
+
+        matched = np.flatnonzero(scores)
+        if matched.size == 0:
+            return []
+        if matched.size > limit:
+            matched = matched[np.argpartition(-scores[matched], limit)[:limit]]
+        ranked = matched[np.argsort(-scores[matched])]
+
+        return [
+            SearchResult(
+                title=self.articles[doc]["title"] or "无标题",
+                content=self._snippet(self.body(doc), query) or "无内容",
+                url=self.articles[doc]["url"],
+                score=0.0
+            )
+            for doc in ranked
+        ]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "index_dir": self.index_dir,
+            "doc_count": self.doc_count,
+            "terms": len(self._lexicon),
+            "postings": int(self._postings.shape[0]),
+            "built_at": self.built_at,
+        }
+
+    def close(self):
+        if isinstance(self._docs, mmap.mmap):
+            self._docs.close()
+        self._docs_file.close()
+
+    @staticmethod
+    def _snippet(body: str, query: str) -> str:
+        """截取正文中第一次命中查询词附近的片段"""
+        lowered = body.lower()
+        positions = [
+            lowered.find(token) for token in sorted(tokenize(query.lower()), key=len, reverse=True)
+        ]
+        positions = [p for p in positions if p >= 0]
+        if not positions:
+            return body[:SNIPPET_CHARS]
+        start = max(0, min(positions) - SNIPPET_CHARS // 4)
+        return body[start:start + SNIPPET_CHARS]
+
+
+def _parse_ids(spec: str) -> List[str]:
+    """解析 "1-100,205,300-310" 形式的文章 ID 列表"""
+    ids = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            ids.extend(str(i) for i in range(int(start), int(end) + 1))
+        else:
+            ids.append(part)
+    return ids
+
+
+async def main():
+    from app.core.scraper.search_automation import ECloudSearcher
+
+    parser = argparse.ArgumentParser(description='移动云帮助中心本地索引')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    refresh_parser = subparsers.add_parser('refresh', help='抓取文章并增量刷新索引')
+    refresh_parser.add_argument('--ids', default='', help='文章 ID，例如 1-3000,4100')
+    refresh_parser.add_argument('--ids-file', help='每行一个文章 ID 的文件')
+    refresh_parser.add_argument('--concurrency', type=int, default=8, help='并发抓取数')
+    refresh_parser.add_argument('--browser', action='store_true', help='使用浏览器渲染文章页面')
+    query_parser = subparsers.add_parser('query', help='在本地索引中检索')
+    query_parser.add_argument('query', help='查询词')
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR, help='索引目录')
+    args = parser.parse_args()
+
+    if args.command == 'query':
+        index = LocalIndex.load(args.index_dir)
+        if index is None:
+            print("索引不存在")
+            return
+        start = time.perf_counter()
+        results = index.search(args.query, limit=5)
+        elapsed = (time.perf_counter() - start) * 1000
+        for result in results:
+            print(f"{result.title} - {result.url}")
+        print(f"耗时 {elapsed:.2f}ms")
+        return
+
+    ids = _parse_ids(args.ids)
+    if args.ids_file:
+        with open(args.ids_file, encoding="utf-8") as f:
+            ids.extend(line.strip() for line in f if line.strip())
+    searcher = ECloudSearcher()
+    render = None
+    if args.browser:
+        async def render(url: str) -> str:
+            async with searcher.browser_pool.lease() as page:
+                await page.goto(url, timeout=searcher.timeout)
+                await page.wait_for_load_state("networkidle")
+                return await page.content()
+
+    try:
+        crawler = ArticleCrawler(searcher.doc_article_url, concurrency=args.concurrency, render=render)
+        stats = await IndexBuilder(args.index_dir).refresh(ids, crawler)
+        print(json.dumps(stats, ensure_ascii=False))
+    finally:
+        await searcher.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional, Union
+
+# 当前请求是否被抽中输出 DEBUG 日志；请求之外（预热、命令行）默认不抽中
+_debug_sampled: ContextVar[bool] = ContextVar("ecloud_debug_sampled", default=False)
+
+# 未抽中的请求使用的级别，以及按请求抽样输出 DEBUG 的比例
+_base_level = logging.INFO
+_sample_rate = 0.0
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _ThreadQueueHandler(logging.handlers.QueueHandler):
+    """只在本进程内跨线程传递记录，不需要预先格式化
+
+    标准 QueueHandler.prepare() 会在调用线程里格式化消息，这里原样入队，
+    格式化和写盘都留给后台线程。日志参数应是不会再被修改的值（字符串、数字）。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class DebugSampler(logging.Filter):
+    """低于基础级别的记录只在抽中的请求中保留，在入队前丢弃"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= _base_level or _debug_sampled.get()
+
+
+def configure(
+    logger: logging.Logger,
+    handlers: Iterable[logging.Handler],
+    base_level: Union[int, str] = logging.INFO,
+    sample_rate: float = 0.0,
+) -> logging.handlers.QueueListener:
+    """让 logger 只写入内存队列，由后台线程交给 handlers 格式化和写出"""
+    global _base_level, _sample_rate, _listener
+    if isinstance(base_level, str):
+        level = logging.getLevelName(base_level.upper())
+        base_level = level if isinstance(level, int) else logging.INFO
+    _base_level = base_level
+    _sample_rate = max(0.0, min(1.0, sample_rate))
+    # 抽样请求需要 DEBUG 记录能通过 logger 自身的级别检查
+    logger.setLevel(logging.DEBUG if _sample_rate > 0 else base_level)
+    logger.addFilter(DebugSampler())
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(_ThreadQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop)
+    return _listener
+
+
+def stop():
+    """写出队列中剩余的记录并停止后台线程"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def quiet_console(level: int = logging.WARNING):
+    """命令行显示进度条时，控制台只输出该级别以上的日志，文件日志不受影响"""
+    if _listener is None:
+        return
+    for handler in _listener.handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setLevel(level)
+
+
+def debug_enabled(logger: logging.Logger) -> bool:
+    """热点路径在拼接 DEBUG 消息前调用，未抽中的请求直接跳过"""
+    return (_base_level <= logging.DEBUG or _debug_sampled.get()) and logger.isEnabledFor(logging.DEBUG)
+
+
+def should_sample() -> bool:
+    return _sample_rate > 0 and random.random() < _sample_rate
+
+
+@contextmanager
+def sampled(enabled: Optional[bool] = None):
+    """在当前上下文中按抽样比例（或指定值）开启 DEBUG 日志，其中创建的任务会继承该设置"""
+    token = _debug_sampled.set(should_sample() if enabled is None else enabled)
+    try:
+        yield
+    finally:
+        _debug_sampled.reset(token)
+
+
+class DebugSamplingMiddleware:
+    """ASGI 中间件：每个 HTTP 请求抽样决定是否输出 DEBUG 日志"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with sampled():
+            await self.app(scope, receive, send)
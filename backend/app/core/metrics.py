@@ -0,0 +1,208 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+# 默认的耗时分桶（秒），覆盖缓存命中的毫秒级到浏览器抓取的数十秒
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# 当前请求收集到的阶段耗时，用于生成 Server-Timing 响应头
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def _labels_key(labels: Optional[Dict[str, str]]) -> LabelValues:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Optional[Dict[str, str]] = None):
+        key = _labels_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # 各分桶计数 + 溢出桶 + sum + count
+                series = self._series[key] = [0.0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+            items = [(key, list(series)) for key, series in items]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {int(cumulative)}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]!r}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {int(series[-1])}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items()) or [((), 0.0)]
+        lines.extend(f"{self.name}{_format_labels(key)} {value!r}" for key, value in items)
+        return lines
+
+
+class Gauge:
+    """取值在导出时通过回调计算，回调可返回单个值或 {标签值: 数值}
+
+    kind 为 counter 时用于导出其他组件中已有的累计计数。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        callback: Callable[[], Union[float, Dict[str, float]]],
+        label: str = "",
+        kind: str = "gauge",
+    ):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.label = label
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            value = self.callback()
+        except Exception:
+            return lines
+        if isinstance(value, dict):
+            for label_value, item in sorted(value.items()):
+                lines.append(f"{self.name}{_format_labels(((self.label, label_value),))} {float(item)!r}")
+        else:
+            lines.append(f"{self.name} {float(value)!r}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help_text, buckets)
+            return self._metrics[name]
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, help_text)
+            return self._metrics[name]
+
+    def gauge(self, name: str, help_text: str, callback, label: str = "", kind: str = "gauge") -> Gauge:
+        """注册回调型指标，同名注册会替换旧回调"""
+        with self._lock:
+            gauge = Gauge(name, help_text, callback, label, kind)
+            self._metrics[name] = gauge
+            return gauge
+
+    def render(self) -> str:
+        """导出 Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 进程内单例
+metrics = MetricsRegistry()
+
+stage_seconds = metrics.histogram(
+    "ecloud_stage_seconds", "Latency of each search pipeline stage in seconds"
+)
+search_retries = metrics.counter(
+    "ecloud_search_retries_total", "Search attempts retried after an exception"
+)
+
+
+@contextmanager
+def span(stage: str):
+    """记录一个阶段的耗时到直方图，并附加到当前请求的 Server-Timing"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, {"stage": stage})
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+@contextmanager
+def collect_timings():
+    """在当前上下文中收集阶段耗时，退出后可用于生成 Server-Timing"""
+    timings: List[Tuple[str, float]] = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def format_server_timing(timings: List[Tuple[str, float]]) -> str:
+    """同一阶段多次出现时累加耗时，单位毫秒"""
+    totals: Dict[str, float] = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items())
@@ -1,5 +1,13 @@
+from dataclasses import dataclass
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+
+@dataclass
+class SearchResult:
+    title: str
+    content: str
+    url: str
+    score: float = 0.0
 
 class SearchQuery(BaseModel):
     query: str
@@ -10,4 +18,28 @@ class SearchResponse(BaseModel):
     title: str
     source_url: str
     confidence: float
-    alternative_results: List[dict]
\ No newline at end of file
+    alternative_results: List[dict]
+
+class BatchSearchQuery(BaseModel):
+    queries: List[SearchQuery]
+
+class BatchSearchItem(BaseModel):
+    query: str
+    status: str  # ok / error
+    cached: bool = False
+    result: Optional[SearchResponse] = None
+    error: Optional[str] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchItem]
+
+class SuggestItem(BaseModel):
+    text: str
+    query: str
+    kind: str  # query / title
+    popularity: int
+    cached: bool
+
+class SuggestResponse(BaseModel):
+    query: str
+    suggestions: List[SuggestItem]
@@ -0,0 +1,160 @@
+import os
+import re
+import unicodedata
+from collections import Counter, OrderedDict
+from itertools import chain
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from app.core.scoring import is_cjk, ngrams
+
+# 只在查询首尾去掉的中文停用词（问句的套话），中间的字不动，避免误伤"目的""是否"等词
+_CJK_PREFIX_STOPWORDS = ("请问一下", "请问", "我想知道", "我想问", "想问一下", "如何", "怎么样", "怎么", "怎样", "什么是")
+_CJK_SUFFIX_STOPWORDS = ("是什么", "是多少", "有哪些", "怎么办", "多少", "吗", "呢", "啊", "吧", "了")
+# 英文按词去掉
+_LATIN_STOPWORDS = frozenset(
+    "a an the how to do does what is are of for in on can i my me please".split()
+)
+
+_SPACE_RE = re.compile(r"\s+")
+_DIGITS_RE = re.compile(r"\d+(?:\.\d+)?")
+# 否定词：只差一个"不"的两个问题答案相反，不能视为相近
+_NEGATION_CHARS = frozenset("不没无非未否")
+
+
+def _negations(text: str) -> Counter:
+    return Counter(ch for ch in text if ch in _NEGATION_CHARS)
+
+
+def _strip_punctuation(text: str) -> str:
+    return "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in text)
+
+
+def _collapse_whitespace(text: str) -> str:
+    """去掉与中文相邻的空白，英文单词之间保留一个空格"""
+    words = _SPACE_RE.split(text.strip())
+    if not words or words == [""]:
+        return ""
+    parts = [words[0]]
+    for word in words[1:]:
+        if is_cjk(parts[-1][-1]) or is_cjk(word[0]):
+            parts.append(word)
+        else:
+            parts.append(" " + word)
+    return "".join(parts)
+
+
+def _strip_stopwords(text: str) -> str:
+    words = [word for word in text.split(" ") if word not in _LATIN_STOPWORDS]
+    text = " ".join(words)
+    changed = True
+    while changed and text:
+        changed = False
+        for word in _CJK_PREFIX_STOPWORDS:
+            if text.startswith(word) and len(text) > len(word):
+                text = text[len(word):].lstrip()
+                changed = True
+        for word in _CJK_SUFFIX_STOPWORDS:
+            if text.endswith(word) and len(text) > len(word):
+                text = text[:-len(word)].rstrip()
+                changed = True
+    return text
+
+
+def normalize_query(query: str) -> str:
+    """查询的规范形式，用作缓存键
+
+    全角转半角（NFKC）、小写、去标点、中文内部去空白、去首尾问句套话和英文停用词。
+    规范化后为空时退回只做小写和去首尾空白的结果。
+    """
+    text = unicodedata.normalize("NFKC", query).lower()
+    text = _collapse_whitespace(_strip_punctuation(text))
+    text = _strip_stopwords(text)
+    return text or query.lower().strip()
+
+
+class NearDuplicateIndex:
+    """已缓存查询键的字符 bi-gram 索引，为精确未命中的查询找足够相近的已缓存键
+
+    相似度为 Dice 系数 2|A∩B| / (|A|+|B|)；数字不同的查询（如 2核 / 4核）
+    和否定词不同的查询（如 支持 / 不支持）从不视为相近。
+    """
+
+    def __init__(self, threshold: float = 0.8, max_keys: int = 10000, min_grams: int = 3):
+        self.threshold = threshold
+        self.max_keys = max(1, max_keys)
+        self.min_grams = min_grams
+        # 键 -> bi-gram 集合，按插入先后淘汰
+        self._keys: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+        self._postings: Dict[str, set] = {}
+
+    @classmethod
+    def from_env(cls) -> "NearDuplicateIndex":
+        return cls(
+            threshold=float(os.getenv("ECLOUD_NEAR_DUP_THRESHOLD", "0.8")),
+            max_keys=int(os.getenv("ECLOUD_NEAR_DUP_MAX_KEYS", "10000")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return 0 < self.threshold < 1
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def _grams(self, key: str) -> FrozenSet[str]:
+        return ngrams(key.replace(" ", ""), 2)
+
+    def add(self, key: str):
+        if not self.enabled or key in self._keys:
+            return
+        grams = self._grams(key)
+        if len(grams) < self.min_grams:
+            return
+        self._keys[key] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+        while len(self._keys) > self.max_keys:
+            self.remove(next(iter(self._keys)))
+
+    def remove(self, key: str):
+        grams = self._keys.pop(key, None)
+        if grams is None:
+            return
+        for gram in grams:
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def clear(self):
+        self._keys.clear()
+        self._postings.clear()
+
+    def find(self, key: str) -> Optional[Tuple[str, float]]:
+        """返回 (最相近的已索引键, 相似度)，没有达到阈值的键时返回 None"""
+        if not self.enabled:
+            return None
+        grams = self._grams(key)
+        if len(grams) < self.min_grams:
+            return None
+        digits = _DIGITS_RE.findall(key)
+        negations = _negations(key)
+        overlap = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in grams))
+        best: Optional[Tuple[str, float]] = None
+        for candidate, shared in overlap.items():
+            if candidate == key:
+                continue
+            similarity = 2 * shared / (len(grams) + len(self._keys[candidate]))
+            if similarity < self.threshold or (best is not None and similarity <= best[1]):
+                continue
+            if _DIGITS_RE.findall(candidate) != digits or _negations(candidate) != negations:
+                continue
+            best = (candidate, similarity)
+        return best
+
+    def stats(self) -> Dict[str, object]:
+        return {"keys": len(self._keys), "threshold": self.threshold, "max_keys": self.max_keys}
@@ -0,0 +1,302 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.core.cache import ResultCache
+from app.core.models import SearchResult
+
+logger = logging.getLogger('ecloud_searcher')
+
+# 命中热度的半衰期：6 小时前的一次命中只算半次
+HIT_HALF_LIFE = 6 * 3600
+# 答案未变化 / 变化时 TTL 的调整倍数
+TTL_GROWTH = 1.5
+TTL_SHRINK = 0.5
+
+
+def results_hash(results: List[SearchResult]) -> str:
+    """结果内容的摘要，不含得分，用于判断答案是否变化"""
+    payload = json.dumps(
+        [(r.title, r.url, r.content) for r in results], ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class KeyStats:
+    query: str
+    ttl: float
+    expires_at: float
+    content_hash: str = ""
+    last_changed: float = 0.0
+    heat: float = 0.0
+    last_hit: float = 0.0
+    # 提前刷新的比例随机化，避免同一批热门查询在同一时刻刷新
+    lead_jitter: float = 1.0
+    # 上次后台刷新没有写入结果时，在此之前不再尝试
+    retry_at: float = 0.0
+    # 本进程最近一次写入缓存的时间，用于识别共享缓存中其他进程写入的更新结果
+    stored_at: float = 0.0
+    stores: int = 0
+    changes: int = 0
+
+    def decayed_heat(self, now: float) -> float:
+        return self.heat * 0.5 ** ((now - self.last_hit) / HIT_HALF_LIFE)
+
+
+class RefreshScheduler:
+    """按查询自适应 TTL，并在后台预算内提前刷新热门查询
+
+    每个缓存键记录衰减后的命中热度和结果摘要：答案没变时 TTL 逐步变长，变了就缩短，
+    最终 TTL 再加随机抖动，避免同时写入的热门查询同时过期。后台循环在热门查询过期前
+    按令牌桶预算重新抓取，有用户请求排队时让路；过期且长期无人访问的条目直接清出缓存。
+
+    键的跟踪和令牌桶都是进程内的。共享缓存下刷新前先看磁盘层，其他 worker 已经写入更新的
+    结果时沿用它的过期时间，不再抓取，多个 worker 合计的刷新量不会随 worker 数成倍增加。
+    """
+
+    def __init__(
+        self,
+        cache: ResultCache,
+        refresh: Callable[[str, str], Awaitable[bool]],
+        is_busy: Callable[[], bool] = lambda: False,
+        base_ttl: float = 24 * 3600,
+        min_ttl: float = 3600,
+        max_ttl: float = 7 * 24 * 3600,
+        jitter: float = 0.1,
+        budget_per_hour: float = 60,
+        interval: float = 30,
+        hot_hits: float = 3,
+        max_keys: int = 10000,
+    ):
+        self.cache = cache
+        self._refresh = refresh
+        self._is_busy = is_busy
+        self.base_ttl = base_ttl
+        self.min_ttl = min(min_ttl, base_ttl)
+        self.max_ttl = max(max_ttl, base_ttl)
+        self.jitter = max(0.0, min(0.5, jitter))
+        self.budget_per_hour = max(0.0, budget_per_hour)
+        self.interval = interval
+        self.hot_hits = hot_hits
+        self.max_keys = max(1, max_keys)
+        self._keys: Dict[str, KeyStats] = {}
+        # 令牌桶：按预算匀速补充，最多攒 5 分钟的量
+        self._capacity = max(1.0, self.budget_per_hour / 12)
+        self._tokens = self._capacity
+        self._refilled_at = time.monotonic()
+        self._stats = {
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "skipped_budget": 0,
+            "skipped_busy": 0,
+            "content_changes": 0,
+            "idle_evictions": 0,
+            "peer_refreshes": 0,
+        }
+
+    @classmethod
+    def from_env(
+        cls,
+        cache: ResultCache,
+        refresh: Callable[[str, str], Awaitable[bool]],
+        is_busy: Callable[[], bool] = lambda: False,
+        base_ttl: float = 24 * 3600,
+    ) -> "RefreshScheduler":
+        return cls(
+            cache,
+            refresh,
+            is_busy,
+            base_ttl=base_ttl,
+            min_ttl=float(os.getenv("ECLOUD_CACHE_MIN_TTL", "3600")),
+            max_ttl=float(os.getenv("ECLOUD_CACHE_MAX_TTL", str(7 * 24 * 3600))),
+            jitter=float(os.getenv("ECLOUD_CACHE_TTL_JITTER", "0.1")),
+            budget_per_hour=float(os.getenv("ECLOUD_REFRESH_BUDGET", "60")),
+            interval=float(os.getenv("ECLOUD_REFRESH_INTERVAL", "30")),
+            hot_hits=float(os.getenv("ECLOUD_REFRESH_HOT_HITS", "3")),
+        )
+
+    def ttl_for(self, key: str, query: str, results: List[SearchResult]) -> float:
+        """写入有效结果时调用，返回带抖动的 TTL 并记录内容变化"""
+        now = time.time()
+        digest = results_hash(results)
+        stats = self._keys.get(key)
+        if stats is None:
+            ttl = self.base_ttl
+            stats = KeyStats(query=query, ttl=ttl, expires_at=now, content_hash=digest,
+                             last_changed=now, heat=1.0, last_hit=now)
+            self._keys[key] = stats
+            if len(self._keys) > self.max_keys:
+                self._forget_coldest(now)
+        else:
+            stats.query = query or stats.query
+            if digest == stats.content_hash:
+                ttl = stats.ttl * TTL_GROWTH
+            else:
+                # 变化间隔比当前 TTL 还短时直接按变化间隔收紧
+                ttl = min(stats.ttl * TTL_SHRINK, now - stats.last_changed)
+                stats.content_hash = digest
+                stats.last_changed = now
+                stats.changes += 1
+                self._stats["content_changes"] += 1
+        stats.ttl = max(self.min_ttl, min(self.max_ttl, ttl))
+        stats.stores += 1
+        stats.lead_jitter = random.uniform(0.5, 1.0)
+        stats.retry_at = 0.0
+        jittered = stats.ttl * random.uniform(1 - self.jitter, 1 + self.jitter)
+        stats.expires_at = now + jittered
+        return jittered
+
+    def record_store(self, key: str, stored_at: float):
+        """记录本进程写入缓存的时间（ResultCache.set 返回条目的 stored_at）"""
+        stats = self._keys.get(key)
+        if stats is not None:
+            stats.stored_at = max(stats.stored_at, stored_at)
+
+    def record_hit(self, key: str):
+        stats = self._keys.get(key)
+        if stats is None:
+            return
+        now = time.time()
+        stats.heat = stats.decayed_heat(now) + 1.0
+        stats.last_hit = now
+
+    def stores(self, key: str) -> int:
+        """该键累计写入有效结果的次数，未跟踪时为 0"""
+        stats = self._keys.get(key)
+        return stats.stores if stats is not None else 0
+
+    def forget(self, key: str):
+        self._keys.pop(key, None)
+
+    def clear(self):
+        self._keys.clear()
+
+    def _forget_coldest(self, now: float):
+        count = max(1, self.max_keys // 10)
+        coldest = sorted(self._keys, key=lambda k: self._keys[k].decayed_heat(now))[:count]
+        for key in coldest:
+            del self._keys[key]
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._refilled_at) * self.budget_per_hour / 3600,
+        )
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _expiring(self, stats: KeyStats, now: float) -> bool:
+        lead = max(2 * self.interval, 0.1 * stats.ttl) * stats.lead_jitter
+        return now >= stats.expires_at - lead
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """即将过期的热门键，按热度从高到低"""
+        now = now or time.time()
+        candidates = []
+        for key, stats in self._keys.items():
+            heat = stats.decayed_heat(now)
+            if heat < self.hot_hits or now < stats.retry_at:
+                continue
+            if self._expiring(stats, now):
+                candidates.append((heat, key))
+        candidates.sort(reverse=True)
+        return [key for _, key in candidates]
+
+    def _adopt_peer(self, stats: KeyStats, key: str) -> bool:
+        """共享缓存中有其他进程更晚写入的结果时沿用其过期时间，返回 True 表示不必再抓取"""
+        meta = self.cache.shared_meta(key)
+        if meta is None or meta[0] <= stats.stored_at:
+            return False
+        stored_at, ttl = meta
+        stats.stored_at = stored_at
+        stats.expires_at = stored_at + ttl
+        stats.retry_at = 0.0
+        self._stats["peer_refreshes"] += 1
+        return not self._expiring(stats, time.time())
+
+    def _evict_idle(self, now: float):
+        """已过期、且一个 TTL 以上无人访问的条目清出本进程
+
+        共享磁盘层中只删除本进程写入的旧记录，其他进程之后写入的结果保留。
+        """
+        for key, stats in list(self._keys.items()):
+            if now > stats.expires_at and now - stats.last_hit > stats.ttl:
+                self.cache.evict_local(key, stats.stored_at)
+                del self._keys[key]
+                self._stats["idle_evictions"] += 1
+
+    async def tick(self):
+        now = time.time()
+        self._evict_idle(now)
+        if self.budget_per_hour <= 0:
+            return
+        for key in self.due(now):
+            if self._is_busy():
+                # 用户请求在排队，后台刷新让路，下一轮再试
+                self._stats["skipped_busy"] += 1
+                return
+            stats = self._keys.get(key)
+            if stats is None:
+                continue
+            if self._adopt_peer(stats, key):
+                # 其他 worker 已经刷新过，不消耗本进程的预算
+                continue
+            if not self._take_token():
+                self._stats["skipped_budget"] += 1
+                return
+            try:
+                ok = await self._refresh(key, stats.query)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                ok = False
+                logger.warning(f"后台刷新失败 {key}: {str(e)}")
+            if ok:
+                self._stats["refreshes"] += 1
+            else:
+                self._stats["refresh_failures"] += 1
+                # 失败或没有写入新结果时推迟一个最小 TTL 再试（同时顺延 expires_at），避免每轮都重复消耗预算
+                stats = self._keys.get(key)
+                if stats is not None and not self._adopt_peer(stats, key):
+                    retry_at = time.time() + self.min_ttl
+                    stats.retry_at = retry_at
+                    stats.expires_at = max(stats.expires_at, retry_at)
+
+    async def run(self):
+        """后台循环，服务关闭时取消"""
+        logger.info(
+            f"后台刷新已启动 - 预算: {self.budget_per_hour:g} 次/小时, 间隔: {self.interval:g}秒"
+        )
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"后台刷新出错: {str(e)}", exc_info=True)
+
+    def stats(self) -> Dict[str, object]:
+        now = time.time()
+        ttls = [stats.ttl for stats in self._keys.values()]
+        return {
+            **self._stats,
+            "tracked_keys": len(self._keys),
+            "hot_keys": sum(1 for s in self._keys.values() if s.decayed_heat(now) >= self.hot_hits),
+            "budget_per_hour": self.budget_per_hour,
+            "tokens": round(self._tokens, 2),
+            "min_ttl": self.min_ttl,
+            "max_ttl": self.max_ttl,
+            "avg_ttl": sum(ttls) / len(ttls) if ttls else 0.0,
+        }
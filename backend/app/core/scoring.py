@@ -0,0 +1,202 @@
+import logging
+import re
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.logging_pipeline import debug_enabled
+from app.core.models import SearchResult
+
+logger = logging.getLogger('ecloud_searcher')
+
+# 拉丁字母/数字按词切分，连续的中日韩字符作为一个词
+_CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_TOKEN_RE = re.compile(f"[0-9a-z_]+|[{_CJK_RANGES}]+")
+_CJK_RE = re.compile(f"[{_CJK_RANGES}]")
+
+# 文本长度超过查询长度的该倍数时，序列匹配只在最相关的窗口内计算
+SEQUENCE_WINDOW_FACTOR = 4
+
+
+def tokenize(text: str) -> List[str]:
+    """CJK 感知的分词：英文按词，中文按连续字符段"""
+    return _TOKEN_RE.findall(text)
+
+
+def is_cjk(text: str) -> bool:
+    return bool(_CJK_RE.search(text))
+
+
+def ngrams(text: str, n: int) -> FrozenSet[str]:
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def distinct_ngram_counts(text: str) -> Tuple[int, int]:
+    """文本中不同 bi-gram / tri-gram 的数量
+
+    把字符编码成 21 位码点后拼成 64 位整数特征向量，排序后统计不同值，
+    避免为长文章逐个切片构建字符串集合。
+    """
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if codes.size < 2:
+        return 0, 0
+    bigrams = (codes[:-1] << np.uint64(21)) | codes[1:]
+    trigrams = (bigrams[:-1] << np.uint64(21)) | codes[2:]
+    return _count_distinct(bigrams), _count_distinct(trigrams)
+
+
+def _count_distinct(values: np.ndarray) -> int:
+    if values.size == 0:
+        return 0
+    values = np.sort(values)
+    return int(np.count_nonzero(values[1:] != values[:-1])) + 1
+
+
+class BatchScorer:
+    """预处理一次查询，对所有候选文本批量打分
+
+    评分维度与权重和原 _calculate_similarity 一致：精确匹配 20%、加权词匹配 35%、
+    序列匹配 25%、n-gram 匹配 20%，再按文本长度惩罚。
+    """
+
+    def __init__(self, query: str):
+        self.query = query.lower().strip()
+        self.query_len = max(len(self.query), 1)
+        self.words = set(tokenize(self.query)) or set(self.query.split())
+        self.cjk_words = {word for word in self.words if is_cjk(word)}
+        longest = max((len(word) for word in self.words), default=1)
+        # 长词给予更高权重
+        self.length_boost = {word: len(word) / longest for word in self.words}
+        self.bigrams = ngrams(self.query, 2)
+        self.trigrams = ngrams(self.query, 3)
+        self.query_chars = frozenset(self.query) - {" "}
+        self._matcher = SequenceMatcher(None, "", self.query)
+        self._memo: Dict[str, float] = {}
+
+    def score(self, text: str) -> float:
+        if not text:
+            return 0.0
+        text = text.lower().strip()
+        if not text:
+            return 0.0
+        cached = self._memo.get(text)
+        if cached is not None:
+            return cached
+
+        # 1. 精确匹配检查 (20% 权重)
+        exact_match_score = 1.0 if self.query in text else 0.0
+
+        # 2. 加权词匹配 (35% 权重)；中文词按子串命中，英文词按整词命中
+        text_words = set(tokenize(text)) if self.words - self.cjk_words else set()
+        weighted_matches = 0.0
+        total_weight = 0.0
+        for word in self.words:
+            count = text.count(word)
+            weight = (1 + 0.5 * count) * self.length_boost[word]
+            total_weight += weight
+            if word in text_words or (count and word in self.cjk_words):
+                weighted_matches += weight
+        tfidf_score = weighted_matches / (total_weight or 1)
+
+        # 3. 序列匹配 (25% 权重)
+        sequence_score = self._sequence_ratio(text)
+
+        # 4. N-gram 匹配 (20% 权重)
+        text_bigrams, text_trigrams = distinct_ngram_counts(text)
+        ngram_score = (
+            self._jaccard(self.bigrams, text, text_bigrams) +
+            self._jaccard(self.trigrams, text, text_trigrams)
+        ) / 2
+
+        final_score = (
+            exact_match_score * 0.20 +
+            tfidf_score * 0.35 +
+            sequence_score * 0.25 +
+            ngram_score * 0.20
+        )
+
+        # 根据文本长度进行惩罚
+        length_ratio = min(len(text) / self.query_len, 5.0) / 5.0
+        final_score *= (0.8 + 0.2 * length_ratio)
+
+        self._memo[text] = final_score
+        return final_score
+
+    def score_many(self, texts: Sequence[str]) -> List[float]:
+        return [self.score(text) for text in texts]
+
+    def rank(
+        self,
+        results: List[SearchResult],
+        on_scored: Optional[Callable[[SearchResult], None]] = None,
+    ) -> List[SearchResult]:
+        """计算每个结果的标题/内容综合得分，并按得分降序排序
+
+        on_scored 在每个结果打分后立即回调，用于流式返回。
+        """
+        for result in results:
+            title_score = self.score(result.title)
+            content_score = self.score(result.content)
+
+            # 根据内容长度调整内容得分权重
+            content_length = len(result.content)
+            if content_length < 50:  # 内容过短可能不够相关
+                content_weight = 0.2
+            elif content_length > 500:  # 内容较长可能更相关
+                content_weight = 0.4
+            else:
+                content_weight = 0.3
+
+            title_weight = 1 - content_weight
+            result.score = title_score * title_weight + content_score * content_weight
+            if on_scored is not None:
+                on_scored(result)
+
+        results.sort(key=lambda x: x.score, reverse=True)
+        if debug_enabled(logger):
+            logger.debug(
+                "批量打分完成 - 候选数: %d, 最高分: %.4f",
+                len(results), results[0].score if results else 0.0,
+            )
+        return results
+
+    def _sequence_ratio(self, text: str) -> float:
+        """有界代价的序列相似度
+
+        短文本直接使用 SequenceMatcher；长文本只在与查询最相关的窗口内求匹配字符数，
+        再按全文长度换算 ratio，代价与查询长度而不是文章长度相关。
+        """
+        window = self.query_len * SEQUENCE_WINDOW_FACTOR
+        if len(text) <= window:
+            self._matcher.set_seq1(text)
+            return self._matcher.ratio()
+
+        # 以查询 n-gram 在文中首次出现的位置为锚点（str.find 在 C 层完成），
+        # 选取包含锚点最多的窗口
+        anchors = sorted(
+            pos for pos in (text.find(gram) for gram in self.trigrams | self.bigrams) if pos >= 0
+        )
+        if not anchors:
+            anchors = sorted(
+                pos for pos in (text.find(ch) for ch in self.query_chars) if pos >= 0
+            )
+        if not anchors:
+            return 0.0
+        best_anchor = max(
+            anchors,
+            key=lambda a: bisect_left(anchors, a + window) - bisect_left(anchors, a)
+        )
+        best_start = max(0, min(best_anchor - self.query_len, len(text) - window))
+
+        self._matcher.set_seq1(text[best_start:best_start + window])
+        matches = sum(block.size for block in self._matcher.get_matching_blocks())
+        return 2.0 * matches / (len(text) + len(self.query))
+
+    @staticmethod
+    def _jaccard(query_grams: FrozenSet[str], text: str, text_gram_count: int) -> float:
+        # 交集只需检查查询的少量 n-gram 是否出现在文本中
+        common = sum(1 for gram in query_grams if gram in text)
+        return common / (len(query_grams) + text_gram_count - common or 1)
+
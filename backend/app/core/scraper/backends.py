@@ -0,0 +1,259 @@
+import asyncio
+import html
+import importlib.util
+import logging
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, List, Optional
+from urllib.parse import quote
+
+import httpx
+
+from app.core.metrics import span
+from app.core.models import SearchResult
+
+logger = logging.getLogger('ecloud_searcher')
+
+# JSON 响应中可能承载结果列表的字段，按常见命名依次查找
+_LIST_KEYS = ("list", "records", "items", "results", "rows", "hits", "docs", "data", "result")
+_TITLE_KEYS = ("title", "docTitle", "articleTitle", "name")
+_CONTENT_KEYS = ("content", "summary", "description", "abstract", "highlight", "snippet")
+_LINK_KEYS = ("url", "link", "href", "path")
+_ID_KEYS = ("articleId", "docId", "id")
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class BackendSchemaError(Exception):
+    """后端响应无法解析为搜索结果"""
+
+
+class SearchBackend(ABC):
+    """搜索后端接口：返回未打分的搜索结果
+
+    timeout 为本次调用剩余的时间预算（秒），后端应在此时间内返回或抛出异常。
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def search(
+        self, query: str, max_results: int, timeout: Optional[float] = None
+    ) -> List[SearchResult]:
+        """返回最多 max_results 条未打分的结果"""
+
+    async def search_progressive(
+        self,
+        query: str,
+        max_results: int,
+        timeout: Optional[float],
+        on_first: Callable[[SearchResult], None],
+    ) -> List[SearchResult]:
+        """与 search 相同，能更早拿到首个结果的后端先用它回调 on_first
+
+        默认实现不回调：一次响应返回全部结果的后端没有更早的时机。
+        """
+        return await self.search(query, max_results, timeout)
+
+    async def close(self):
+        pass
+
+
+class HttpSearchBackend(SearchBackend):
+    """直接调用帮助中心搜索接口，使用连接池复用长连接"""
+
+    name = "http"
+
+    def __init__(
+        self,
+        api_url: str,
+        build_full_url: Callable[[str], str],
+        query_param: str = "q",
+        size_param: Optional[str] = "size",
+        timeout: float = 10.0,
+        max_connections: int = 20,
+    ):
+        self.api_url = api_url
+        self.build_full_url = build_full_url
+        self.query_param = query_param
+        self.size_param = size_param
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            # 安装了 h2 时启用 HTTP/2
+            http2 = importlib.util.find_spec("h2") is not None
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                headers={"Accept": "application/json"},
+            )
+            logger.debug(f"HTTP 搜索客户端已创建 (HTTP/2: {http2})")
+        return self._client
+
+    async def search(
+        self, query: str, max_results: int, timeout: Optional[float] = None
+    ) -> List[SearchResult]:
+        params = {self.query_param: query}
+        if self.size_param:
+            params[self.size_param] = max_results
+        timeout = self.timeout if timeout is None else min(self.timeout, timeout)
+        with span("http_request"):
+            response = await self._get_client().get(self.api_url, params=params, timeout=timeout)
+        response.raise_for_status()
+        try:
+            payload = response.json()
+        except ValueError as e:
+            raise BackendSchemaError(f"响应不是 JSON: {str(e)}")
+        return self.parse(payload)[:max_results]
+
+    def parse(self, payload: Any) -> List[SearchResult]:
+        items = _find_items(payload)
+        if items is None:
+            raise BackendSchemaError("响应中没有找到结果列表")
+
+        results = []
+        for item in items:
+            title = _clean(_first(item, _TITLE_KEYS))
+            content = _clean(_first(item, _CONTENT_KEYS))
+            link = _first(item, _LINK_KEYS) or _first(item, _ID_KEYS)
+            if not title and not content:
+                continue
+            results.append(SearchResult(
+                title=title or "无标题",
+                content=content or "无内容",
+                url=self.build_full_url(str(link)) if link else "",
+                score=0.0
+            ))
+        if items and not results:
+            raise BackendSchemaError("结果条目缺少标题和内容字段")
+        return results
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class PlaywrightSearchBackend(SearchBackend):
+    """通过浏览器池打开搜索页面并提取结果"""
+
+    name = "playwright"
+
+    def __init__(
+        self,
+        browser_pool,
+        page_loader,
+        extract: Callable[[Any, int], Awaitable[List[SearchResult]]],
+        search_url: str,
+        timeout: int,
+    ):
+        self.browser_pool = browser_pool
+        self.page_loader = page_loader
+        self.extract = extract
+        self.search_url = search_url
+        self.timeout = timeout
+
+    async def search(
+        self, query: str, max_results: int, timeout: Optional[float] = None
+    ) -> List[SearchResult]:
+        return await self._search(query, max_results, timeout)
+
+    async def search_progressive(
+        self,
+        query: str,
+        max_results: int,
+        timeout: Optional[float],
+        on_first: Callable[[SearchResult], None],
+    ) -> List[SearchResult]:
+        """页面加载期间结果容器一出现就提取并回调首个结果，加载完成后再批量提取全部结果"""
+        return await self._search(query, max_results, timeout, on_first)
+
+    async def _search(
+        self,
+        query: str,
+        max_results: int,
+        timeout: Optional[float],
+        on_first: Optional[Callable[[SearchResult], None]] = None,
+    ) -> List[SearchResult]:
+        # self.timeout 为单页上限（毫秒），按剩余预算收紧
+        timeout_ms = self.timeout if timeout is None else max(1, min(self.timeout, int(timeout * 1000)))
+        async with self.browser_pool.lease() as page:
+            logger.debug("已从浏览器池租借页面")
+
+            search_page_url = f"{self.search_url}?q={quote(query)}"
+            logger.info(f"访问搜索页面: {search_page_url}")
+
+            load = asyncio.ensure_future(self.page_loader.load(page, search_page_url, timeout_ms))
+            try:
+                if on_first is not None:
+                    await self._emit_first(page, load, timeout_ms, on_first)
+                await load
+            finally:
+                load.cancel()
+            logger.debug("页面加载完成")
+
+            with span("extract"):
+                return await self.extract(page, max_results)
+
+    async def _emit_first(
+        self, page, load: asyncio.Future, timeout_ms: int, on_first: Callable[[SearchResult], None]
+    ):
+        """结果容器先于页面加载完成出现时提取首个结果；出错或加载先完成时不回调"""
+        waiter = asyncio.ensure_future(self.page_loader.wait_for_results(page, timeout_ms))
+        try:
+            await asyncio.wait({waiter, load}, return_when=asyncio.FIRST_COMPLETED)
+            if load.done() or not waiter.done() or waiter.exception() is not None:
+                return
+            with span("extract_first"):
+                first = await self.extract(page, 1)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug("提取首个结果失败，等待批量提取: %s", e)
+            return
+        finally:
+            waiter.cancel()
+        # 还没有链接的条目可能仍在渲染
+        if first and first[0].url:
+            on_first(first[0])
+
+    async def close(self):
+        await self.browser_pool.close()
+
+
+def _find_items(payload: Any, depth: int = 0) -> Optional[List[dict]]:
+    if isinstance(payload, list):
+        if all(isinstance(item, dict) for item in payload):
+            return payload
+        return None
+    if isinstance(payload, dict) and depth < 4:
+        for key in _LIST_KEYS:
+            if key in payload:
+                found = _find_items(payload[key], depth + 1)
+                if found is not None:
+                    return found
+    return None
+
+
+def _first(item: dict, keys) -> Any:
+    for key in keys:
+        value = item.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _clean(value: Any) -> str:
+    """去掉高亮标签等 HTML 片段"""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        value = " ".join(str(part) for part in value)
+    return html.unescape(_TAG_RE.sub("", str(value))).strip()
@@ -0,0 +1,319 @@
+import asyncio
+import logging
+import os
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+from app.core.metrics import span
+
+logger = logging.getLogger('ecloud_searcher')
+
+
+class BrowserPoolTimeout(Exception):
+    """在等待时间内没有租借到可用页面"""
+
+
+@dataclass
+class _BrowserHandle:
+    index: int
+    browser: Any = None
+    generation: int = 0
+    uses: int = 0
+    active: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def is_alive(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+
+@dataclass
+class _ContextSlot:
+    handle: _BrowserHandle
+    context: Any = None
+    generation: int = -1
+    uses: int = 0
+
+
+class BrowserPool:
+    """常驻的 Chromium 浏览器/上下文池，按查询租借页面"""
+
+    def __init__(
+        self,
+        size: int = 2,
+        contexts_per_browser: int = 2,
+        max_context_uses: int = 50,
+        max_browser_uses: int = 500,
+        lease_timeout: float = 15.0,
+        health_check_interval: float = 30.0,
+        headless: bool = True,
+    ):
+        self.size = max(1, size)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.max_context_uses = max_context_uses
+        self.max_browser_uses = max_browser_uses
+        self.lease_timeout = lease_timeout
+        self.health_check_interval = health_check_interval
+        self.headless = headless
+
+        self._playwright = None
+        self._handles: List[_BrowserHandle] = []
+        self._slots: List[_ContextSlot] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock = asyncio.Lock()
+        self._health_task: Optional[asyncio.Task] = None
+        self._leased = 0
+        self._waiting = 0
+        self._counters = {
+            "leases": 0,
+            "lease_timeouts": 0,
+            "lease_wait_total": 0.0,
+            "lease_wait_max": 0.0,
+            "context_recycles": 0,
+            "browser_relaunches": 0,
+            "crashes": 0,
+            "health_checks": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "BrowserPool":
+        """从环境变量读取池配置，便于按 CPU 核数调整"""
+        return cls(
+            size=int(os.getenv("ECLOUD_BROWSER_POOL_SIZE", "2")),
+            contexts_per_browser=int(os.getenv("ECLOUD_CONTEXTS_PER_BROWSER", "2")),
+            max_context_uses=int(os.getenv("ECLOUD_CONTEXT_MAX_USES", "50")),
+            max_browser_uses=int(os.getenv("ECLOUD_BROWSER_MAX_USES", "500")),
+            lease_timeout=float(os.getenv("ECLOUD_BROWSER_LEASE_TIMEOUT", "15")),
+            health_check_interval=float(os.getenv("ECLOUD_BROWSER_HEALTH_INTERVAL", "30")),
+        )
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    async def start(self):
+        """启动 Playwright 并预热所有浏览器和上下文"""
+        if self._idle is not None:
+            return
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+            logger.info(
+                f"启动浏览器池: {self.size} 个浏览器 x {self.contexts_per_browser} 个上下文"
+            )
+            self._playwright = await async_playwright().start()
+            self._handles = [_BrowserHandle(index=i) for i in range(self.size)]
+            try:
+                await asyncio.gather(*(self._launch(handle) for handle in self._handles))
+
+                idle = asyncio.Queue()
+                self._slots = []
+                for handle in self._handles:
+                    for _ in range(self.contexts_per_browser):
+                        slot = _ContextSlot(handle=handle)
+                        await self._new_context(slot)
+                        self._slots.append(slot)
+                        idle.put_nowait(slot)
+            except BaseException:
+                # 部分启动失败时释放已启动的浏览器和 Playwright 驱动
+                await self.close()
+                raise
+            self._idle = idle
+
+            if self.health_check_interval > 0:
+                self._health_task = asyncio.create_task(self._health_loop())
+            logger.info("浏览器池已就绪")
+
+    async def close(self):
+        """关闭所有上下文、浏览器和 Playwright 驱动"""
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+        for slot in self._slots:
+            await self._close_context(slot)
+        for handle in self._handles:
+            if handle.browser:
+                try:
+                    await handle.browser.close()
+                except Exception as e:
+                    logger.debug(f"关闭浏览器失败: {str(e)}")
+                handle.browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+        self._slots = []
+        self._handles = []
+        self._idle = None
+        logger.info("浏览器池已关闭")
+
+    @asynccontextmanager
+    async def lease(self):
+        """租借一个新页面，用完后自动归还所在上下文"""
+        await self.start()
+
+        wait_start = time.monotonic()
+        self._waiting += 1
+        try:
+            with span("browser_lease_wait"):
+                slot = await asyncio.wait_for(self._idle.get(), timeout=self.lease_timeout)
+        except asyncio.TimeoutError:
+            self._counters["lease_timeouts"] += 1
+            raise BrowserPoolTimeout(f"等待浏览器超时 ({self.lease_timeout}秒)")
+        finally:
+            self._waiting -= 1
+
+        waited = time.monotonic() - wait_start
+        self._counters["leases"] += 1
+        self._counters["lease_wait_total"] += waited
+        self._counters["lease_wait_max"] = max(self._counters["lease_wait_max"], waited)
+
+        page = None
+        crashed = False
+        acquired = False
+        self._leased += 1
+        try:
+            with span("browser_acquire"):
+                await self._acquire(slot)
+                acquired = True
+                page = await slot.context.new_page()
+
+            def _on_crash(_):
+                # 页面崩溃后归还时强制回收该上下文
+                slot.uses = self.max_context_uses
+
+            page.on("crash", _on_crash)
+            yield page
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            crashed = True
+            raise
+        finally:
+            self._leased -= 1
+            await self._release(slot, page, crashed, acquired)
+
+    def stats(self) -> Dict[str, Any]:
+        leases = self._counters["leases"]
+        return {
+            "size": self.size,
+            "contexts_per_browser": self.contexts_per_browser,
+            "max_context_uses": self.max_context_uses,
+            "max_browser_uses": self.max_browser_uses,
+            "lease_timeout": self.lease_timeout,
+            "started": self.started,
+            "browsers_alive": sum(1 for handle in self._handles if handle.is_alive()),
+            "idle": self._idle.qsize() if self._idle else 0,
+            "leased": self._leased,
+            "waiting": self._waiting,
+            "leases": leases,
+            "lease_timeouts": self._counters["lease_timeouts"],
+            "lease_wait_avg_ms": (
+                self._counters["lease_wait_total"] / leases * 1000 if leases else 0.0
+            ),
+            "lease_wait_max_ms": self._counters["lease_wait_max"] * 1000,
+            "context_recycles": self._counters["context_recycles"],
+            "browser_relaunches": self._counters["browser_relaunches"],
+            "crashes": self._counters["crashes"],
+            "health_checks": self._counters["health_checks"],
+        }
+
+    async def _acquire(self, slot: _ContextSlot):
+        """确保槽位的浏览器存活、上下文属于当前浏览器代次"""
+        handle = slot.handle
+        async with handle.lock:
+            if not handle.is_alive():
+                self._counters["crashes"] += 1
+                logger.warning(f"浏览器 #{handle.index} 已断开，重新启动")
+                await self._launch(handle)
+            elif handle.uses >= self.max_browser_uses and handle.active == 0:
+                logger.info(f"浏览器 #{handle.index} 已使用 {handle.uses} 次，回收重启")
+                await self._launch(handle)
+
+            if slot.context is None or slot.generation != handle.generation:
+                await self._new_context(slot)
+            handle.active += 1
+
+    async def _release(self, slot: _ContextSlot, page, crashed: bool, acquired: bool):
+        handle = slot.handle
+        try:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception as e:
+                    logger.debug(f"关闭页面失败: {str(e)}")
+            if acquired:
+                handle.active -= 1
+                handle.uses += 1
+                slot.uses += 1
+            if crashed or slot.uses >= self.max_context_uses:
+                async with handle.lock:
+                    await self._close_context(slot)
+                    self._counters["context_recycles"] += 1
+        finally:
+            self._idle.put_nowait(slot)
+
+    async def _launch(self, handle: _BrowserHandle):
+        if handle.browser is not None:
+            try:
+                await handle.browser.close()
+            except Exception as e:
+                logger.debug(f"关闭旧浏览器失败: {str(e)}")
+            self._counters["browser_relaunches"] += 1
+
+        try:
+            with span("browser_launch"):
+                handle.browser = await self._playwright.chromium.launch(headless=self.headless)
+        except Exception:
+            logger.error("浏览器启动失败，尝试安装浏览器")
+            try:
+                subprocess.run(["python3", "-m", "playwright", "install", "chromium"])
+            except Exception as e:
+                logger.error(f"安装 Playwright 失败: {e}")
+                raise
+            handle.browser = await self._playwright.chromium.launch(headless=self.headless)
+
+        handle.generation += 1
+        handle.uses = 0
+        logger.debug("浏览器 #%d 已启动 (第 %d 代)", handle.index, handle.generation)
+
+    async def _new_context(self, slot: _ContextSlot):
+        await self._close_context(slot)
+        slot.context = await slot.handle.browser.new_context()
+        slot.generation = slot.handle.generation
+        slot.uses = 0
+
+    async def _close_context(self, slot: _ContextSlot):
+        if slot.context is None:
+            return
+        try:
+            await slot.context.close()
+        except Exception as e:
+            logger.debug(f"关闭上下文失败: {str(e)}")
+        slot.context = None
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for handle in self._handles:
+                self._counters["health_checks"] += 1
+                if handle.is_alive():
+                    continue
+                async with handle.lock:
+                    if handle.is_alive():
+                        continue
+                    self._counters["crashes"] += 1
+                    logger.warning(f"健康检查发现浏览器 #{handle.index} 已断开，重新启动")
+                    try:
+                        await self._launch(handle)
+                    except Exception as e:
+                        logger.error(f"重启浏览器失败: {str(e)}", exc_info=True)
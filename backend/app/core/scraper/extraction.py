@@ -0,0 +1,122 @@
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger('ecloud_searcher')
+
+# 搜索结果容器的选择器链，按优先级排列
+RESULT_SELECTORS = [
+    ".search-result-item",
+    ".result-item",
+    ".search-list li",
+    ".list-item",
+    "div[class*='result']",
+]
+# 兜底选择器也会匹配 .no-result 之类的空状态，不作为站点的首选记住
+CATCH_ALL_SELECTOR = RESULT_SELECTORS[-1]
+
+TITLE_SELECTORS = [
+    "h3",
+    ".title",
+    ".heading",
+    "a",
+    "[class*='title']",
+]
+
+CONTENT_SELECTORS = [
+    ".description",
+    ".summary",
+    ".content",
+    "p",
+    "[class*='content']",
+]
+
+# 在页面内一次性完成容器匹配和标题/内容/链接提取，只产生一次 IPC 往返
+_EXTRACT_SCRIPT = """
+({resultSelectors, titleSelectors, contentSelectors, maxResults}) => {
+    const firstText = (root, selectors) => {
+        for (const selector of selectors) {
+            let node = null;
+            try {
+                node = root.querySelector(selector);
+            } catch (e) {
+                continue;
+            }
+            const text = node ? (node.innerText || '').trim() : '';
+            if (text) {
+                return text;
+            }
+        }
+        return '';
+    };
+
+    for (const selector of resultSelectors) {
+        let elements = [];
+        try {
+            elements = Array.from(document.querySelectorAll(selector));
+        } catch (e) {
+            continue;
+        }
+        if (!elements.length) {
+            continue;
+        }
+        const items = elements.slice(0, maxResults).map((element) => {
+            const fullText = (element.innerText || '').trim();
+            const title = firstText(element, titleSelectors) || fullText;
+            let content = firstText(element, contentSelectors);
+            if (!content) {
+                content = title ? fullText.split(title).join('').trim() : fullText;
+            }
+            const link = element.querySelector('a');
+            return {
+                title: title,
+                content: content,
+                href: link ? (link.getAttribute('href') || '') : '',
+            };
+        });
+        return {selector: selector, items: items};
+    }
+    return {selector: null, items: []};
+}
+"""
+
+
+class BatchExtractor:
+    """通过单次 page.evaluate 批量提取搜索结果，并记住每个站点上次命中的选择器"""
+
+    def __init__(
+        self,
+        result_selectors: Optional[List[str]] = None,
+        title_selectors: Optional[List[str]] = None,
+        content_selectors: Optional[List[str]] = None,
+    ):
+        self.result_selectors = result_selectors or list(RESULT_SELECTORS)
+        self.title_selectors = title_selectors or list(TITLE_SELECTORS)
+        self.content_selectors = content_selectors or list(CONTENT_SELECTORS)
+        self._preferred: Dict[str, str] = {}
+
+    def selector_order(self, site: str) -> List[str]:
+        """上次命中的选择器排在最前，其余保持原有顺序"""
+        preferred = self._preferred.get(site)
+        if not preferred:
+            return list(self.result_selectors)
+        return [preferred] + [s for s in self.result_selectors if s != preferred]
+
+    async def extract(self, page, max_results: int) -> List[Dict[str, str]]:
+        """返回 [{title, content, href}, ...]，没有匹配的容器时返回空列表"""
+        site = urlparse(page.url).netloc
+        payload = await page.evaluate(
+            _EXTRACT_SCRIPT,
+            {
+                "resultSelectors": self.selector_order(site),
+                "titleSelectors": self.title_selectors,
+                "contentSelectors": self.content_selectors,
+                "maxResults": max_results,
+            },
+        )
+        selector = payload.get("selector")
+        if selector and selector != CATCH_ALL_SELECTOR:
+            if self._preferred.get(site) != selector:
+                logger.debug("站点 %s 记住结果选择器: %s", site, selector)
+            self._preferred[site] = selector
+        return payload.get("items") or []
@@ -0,0 +1,156 @@
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from app.core.metrics import span
+from app.core.scraper.extraction import CATCH_ALL_SELECTOR, RESULT_SELECTORS
+
+logger = logging.getLogger('ecloud_searcher')
+
+# 搜索无结果时页面上出现的空状态标记
+EMPTY_STATE_SELECTORS = [
+    ".empty",
+    ".no-result",
+]
+# 具体的结果容器，不含兜底的 div[class*='result']
+RESULT_WAIT_SELECTORS = [s for s in RESULT_SELECTORS if s != CATCH_ALL_SELECTOR]
+# 快速模式等待的选择器：只用具体的结果容器和明确的空状态标记。
+# 兜底的 div[class*='result'] 和 [class*='empty'] 会命中结果接口返回前就挂载的外层容器或骨架屏，
+# 提前返回会提取到空结果并按空结果缓存。
+WAIT_SELECTORS = RESULT_WAIT_SELECTORS + EMPTY_STATE_SELECTORS
+
+DEFAULT_BLOCKED_TYPES = {"image", "media", "font", "stylesheet", "texttrack", "manifest"}
+
+
+@dataclass
+class PageLoadStats:
+    fast: bool
+    elapsed: float = 0.0
+    allowed_requests: int = 0
+    loaded_bytes: int = 0
+    blocked_requests: int = 0
+    blocked_by_type: Dict[str, int] = field(default_factory=dict)
+    third_party_blocked: int = 0
+    matched_selector: bool = False
+
+
+class PageLoader:
+    """加载搜索页面；快速模式下拦截非必要资源，结果选择器出现即返回"""
+
+    def __init__(
+        self,
+        fast: bool = False,
+        allowed_hosts: Iterable[str] = (),
+        blocked_types: Optional[Iterable[str]] = None,
+        wait_selectors: Optional[List[str]] = None,
+    ):
+        self.fast = fast
+        self.allowed_hosts = {host.lower() for host in allowed_hosts if host}
+        self.blocked_types = set(blocked_types) if blocked_types is not None else set(DEFAULT_BLOCKED_TYPES)
+        self.wait_selectors = wait_selectors or list(WAIT_SELECTORS)
+        self._totals = {
+            "loads": 0,
+            "fast_loads": 0,
+            "blocked_requests": 0,
+            "loaded_bytes": 0,
+            "selector_timeouts": 0,
+        }
+
+    @classmethod
+    def from_env(cls, allowed_hosts: Iterable[str] = ()) -> "PageLoader":
+        """ECLOUD_FAST_PAGE_LOAD=1 开启快速模式，ECLOUD_FAST_LOAD_BLOCK_TYPES 覆盖拦截的资源类型"""
+        blocked = os.getenv("ECLOUD_FAST_LOAD_BLOCK_TYPES")
+        return cls(
+            fast=os.getenv("ECLOUD_FAST_PAGE_LOAD", "0").lower() in ("1", "true", "yes"),
+            allowed_hosts=allowed_hosts,
+            blocked_types=[t.strip() for t in blocked.split(",") if t.strip()] if blocked else None,
+        )
+
+    def is_first_party(self, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        if not host or not self.allowed_hosts:
+            return True
+        return any(host == allowed or host.endswith("." + allowed) for allowed in self.allowed_hosts)
+
+    async def load(self, page, url: str, timeout: int) -> PageLoadStats:
+        """打开页面并等待可提取状态，timeout 单位为毫秒"""
+        stats = PageLoadStats(fast=self.fast)
+        start = time.monotonic()
+        self._totals["loads"] += 1
+
+        if not self.fast:
+            with span("page_goto"):
+                await page.goto(url, timeout=timeout)
+            remaining = max(1000, timeout - int((time.monotonic() - start) * 1000))
+            with span("page_networkidle"):
+                await page.wait_for_load_state("networkidle", timeout=remaining)
+            stats.elapsed = time.monotonic() - start
+            return stats
+
+        self._totals["fast_loads"] += 1
+
+        async def handle_route(route):
+            request = route.request
+            resource_type = request.resource_type
+            if resource_type in self.blocked_types:
+                stats.blocked_requests += 1
+                stats.blocked_by_type[resource_type] = stats.blocked_by_type.get(resource_type, 0) + 1
+                await route.abort()
+            elif not self.is_first_party(request.url):
+                stats.blocked_requests += 1
+                stats.third_party_blocked += 1
+                stats.blocked_by_type[resource_type] = stats.blocked_by_type.get(resource_type, 0) + 1
+                await route.abort()
+            else:
+                stats.allowed_requests += 1
+                await route.continue_()
+
+        def on_response(response):
+            length = response.headers.get("content-length")
+            if length and length.isdigit():
+                stats.loaded_bytes += int(length)
+
+        page.on("response", on_response)
+        await page.route("**/*", handle_route)
+
+        with span("page_goto"):
+            await page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+        remaining = max(1000, timeout - int((time.monotonic() - start) * 1000))
+        try:
+            with span("page_wait_selector"):
+                await page.wait_for_selector(
+                    ", ".join(self.wait_selectors), state="attached", timeout=remaining
+                )
+            stats.matched_selector = True
+        except Exception as e:
+            # 选择器超时不视为失败，交给提取阶段判断是否有结果
+            self._totals["selector_timeouts"] += 1
+            logger.warning(f"等待结果选择器超时: {str(e)}")
+
+        stats.elapsed = time.monotonic() - start
+        self._totals["blocked_requests"] += stats.blocked_requests
+        self._totals["loaded_bytes"] += stats.loaded_bytes
+        logger.info(
+            f"快速加载完成 - 耗时: {stats.elapsed:.2f}秒, 拦截请求: {stats.blocked_requests} "
+            f"(第三方 {stats.third_party_blocked}), 放行请求: {stats.allowed_requests}, "
+            f"加载字节: {stats.loaded_bytes}"
+        )
+        return stats
+
+    async def wait_for_results(self, page, timeout: int):
+        """等到第一个具体的结果容器挂载，可与 load() 并行，在页面加载完成前提取首个结果"""
+        with span("page_first_result"):
+            await page.wait_for_selector(
+                ", ".join(RESULT_WAIT_SELECTORS), state="attached", timeout=timeout
+            )
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "fast": self.fast,
+            "blocked_types": sorted(self.blocked_types),
+            "allowed_hosts": sorted(self.allowed_hosts),
+            **self._totals,
+        }
@@ -1,20 +1,44 @@
 import asyncio
+import json
 import logging
 import logging.handlers
 import os
-from difflib import SequenceMatcher
-from dataclasses import dataclass
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
 from functools import lru_cache
 from datetime import datetime, timedelta
-from playwright.async_api import async_playwright
-from typing import List, Tuple, Optional, Dict
-from urllib.parse import quote
+from typing import AsyncIterator, Callable, List, Set, TextIO, Tuple, Optional, Dict
+from urllib.parse import urlparse
 import argparse
 from rich.console import Console
 from rich.table import Table
-from rich.progress import Progress
+from rich.progress import BarColumn, Progress, TextColumn, TimeRemainingColumn
 from rich.prompt import Prompt
 from rich import print as rprint
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.core.answer_extraction import AnswerExtractor
+from app.core import logging_pipeline
+from app.core.cache import CacheEntry, ResultCache
+from app.core.indexer import DEFAULT_INDEX_DIR, LocalIndex
+from app.core.metrics import metrics, search_retries, span
+from app.core.models import SearchResult
+from app.core.normalization import NearDuplicateIndex, normalize_query
+from app.core.refresh import RefreshScheduler
+from app.core.scoring import BatchScorer
+from app.core.suggest import SuggestIndex
+from app.core.scraper.backends import HttpSearchBackend, PlaywrightSearchBackend, SearchBackend
+from app.core.scraper.browser_pool import BrowserPool
+from app.core.scraper.extraction import BatchExtractor, RESULT_SELECTORS
+from app.core.scraper.page_loader import PageLoader
+
+# 日志目录（backend/logs），按天切割的历史日志也用于挖掘热门查询
+LOG_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
+    'logs'
+)
+LOG_FILE_NAME = 'search_automation.log'
 
 # 更新日志配置
 def setup_logging():
@@ -23,17 +47,11 @@ def setup_logging():
     # 防止重复添加 handlers
     if logger.handlers:
         return logger
-        
-    logger.setLevel(logging.DEBUG)
     
     # 创建日志目录
-    log_dir = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
-        'logs'
-    )
-    os.makedirs(log_dir, exist_ok=True)
+    os.makedirs(LOG_DIR, exist_ok=True)
     
-    log_file = os.path.join(log_dir, 'search_automation.log')
+    log_file = os.path.join(LOG_DIR, LOG_FILE_NAME)
     
     # 文件处理器 - 按天切割日志
     file_handler = logging.handlers.TimedRotatingFileHandler(
@@ -56,20 +74,29 @@ def setup_logging():
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
     
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # 事件循环只把记录放进队列，格式化和写盘在后台线程完成；
+    # 未抽中的请求只输出 ECLOUD_LOG_LEVEL 及以上级别，抽中的请求输出完整 DEBUG
+    logging_pipeline.configure(
+        logger,
+        [file_handler, console_handler],
+        base_level=os.getenv("ECLOUD_LOG_LEVEL", "INFO"),
+        sample_rate=float(os.getenv("ECLOUD_LOG_DEBUG_SAMPLE_RATE", "0.01")),
+    )
     
     return logger
 
 # 使用单例模式管理 logger
 logger = setup_logging()
 
-@dataclass
-class SearchResult:
-    title: str
-    content: str
-    url: str
-    score: float = 0.0
+# 等待其他 worker 写入共享缓存时的轮询间隔（秒）
+PEER_POLL_INTERVAL = 0.25
+
+# 对冲请求至少需要这么多次成功抓取的耗时样本才启用
+HEDGE_MIN_SAMPLES = 20
+
+# 占位结果标题，用于识别空结果和错误结果
+NO_RESULT_TITLE = "未找到相关结果"
+ERROR_TITLE_PREFIX = "搜索出错"
 
 @dataclass
 class SearchConfig:
@@ -85,27 +112,227 @@ class SearchConfig:
         pass
 
 class ECloudSearcher:
-    def __init__(self):
+    def __init__(
+        self,
+        browser_pool: Optional[BrowserPool] = None,
+        cache: Optional[ResultCache] = None,
+        backends: Optional[List[SearchBackend]] = None,
+        admission: Optional[AdmissionController] = None,
+    ):
         # 直接使用全局 logger，不再创建新实例
         self.logger = logging.getLogger('ecloud_searcher')
-        self.base_url = "https://ecloud.10086.cn"
-        self.help_center_url = "https://ecloud.10086.cn/op-help-center"
-        self.search_url = "https://ecloud.10086.cn/op-help-center/search-engine/search/"
-        self.doc_article_url = "https://ecloud.10086.cn/op-help-center/doc/article/"
+        # 站点地址可通过 ECLOUD_BASE_URL 指向本地替身服务
+        self.base_url = os.getenv("ECLOUD_BASE_URL", "https://ecloud.10086.cn").rstrip("/")
+        self.help_center_url = f"{self.base_url}/op-help-center"
+        self.search_url = f"{self.base_url}/op-help-center/search-engine/search/"
+        self.doc_article_url = f"{self.base_url}/op-help-center/doc/article/"
         self.timeout = 30000
-        self.cache = {}
         self.cache_ttl = timedelta(hours=24)
+        # 过期后仍可先返回旧结果、后台刷新的窗口
+        self.stale_ttl = timedelta(hours=24)
+        # 负缓存：错误结果和空结果使用更短的 TTL，且不做陈旧返回
+        self.error_cache_ttl = timedelta(seconds=30)
+        self.empty_cache_ttl = timedelta(minutes=10)
+        # 有界的两级结果缓存（内存 LRU + 可选磁盘层）
+        self.cache = cache or ResultCache.from_env(
+            default_ttl=self.cache_ttl.total_seconds(),
+            stale_ttl=self.stale_ttl.total_seconds(),
+            encode=lambda results: [asdict(r) for r in results],
+            decode=lambda items: [SearchResult(**item) for item in items],
+        )
+        # 常驻浏览器池，避免每次搜索冷启动 Chromium
+        self.browser_pool = browser_pool or BrowserPool.from_env()
+        # 单次往返的批量 DOM 提取，记住各站点上次命中的结果选择器
+        self.extractor = BatchExtractor()
+        # 页面加载策略，可选快速模式（拦截非必要资源、结果出现即返回）
+        self.page_loader = PageLoader.from_env(allowed_hosts=[urlparse(self.search_url).hostname])
+        # 搜索后端链：配置了 ECLOUD_SEARCH_API_URL 时优先直接调用接口，失败回退到浏览器
+        self.backends = backends or self._default_backends()
+        self.backend_stats = {
+            backend.name: {"successes": 0, "failures": 0} for backend in self.backends
+        }
+        # 本地倒排索引：置信度足够时直接作答，不访问线上站点
+        self.local_index = LocalIndex.load(DEFAULT_INDEX_DIR)
+        self.local_min_confidence = float(os.getenv("ECLOUD_LOCAL_MIN_CONFIDENCE", "0.35"))
+        # 单个请求的时间预算（秒），重试只在剩余预算足够时进行
+        self.search_budget = float(os.getenv("ECLOUD_SEARCH_BUDGET", "20"))
+        # 首次抓取超过近期 p95 耗时仍未完成时，并行发起第二次抓取，先完成者胜出
+        self.hedge_enabled = os.getenv("ECLOUD_SEARCH_HEDGE", "0").lower() in ("1", "true", "yes")
+        self._attempt_durations: deque = deque(maxlen=200)
+        # 共享缓存下跨进程抓取占用的有效期，应长于一次带重试的抓取
+        self.claim_ttl = float(os.getenv("ECLOUD_CACHE_CLAIM_TTL", "90"))
+        # 在线抓取的并发上限和排队，超出时快速拒绝
+        self.admission = admission or AdmissionController.from_env()
+        # 排序后打开前几篇文章，取最匹配的段落作为答案（文章按 URL 缓存）
+        self.answer_extractor = AnswerExtractor.from_env(
+            allowed_hosts=[urlparse(self.base_url).hostname]
+        )
+        # 已缓存查询键的 n-gram 索引，精确未命中时用足够相近的查询的结果作答
+        self.near_duplicates = NearDuplicateIndex.from_env()
+        # 已回答查询和结果标题的输入建议索引，写入结果和命中缓存时增量更新
+        self.suggestions = SuggestIndex.from_env()
+        # 按命中热度和内容变化自适应每个查询的 TTL，并在后台预算内提前刷新热门查询
+        self.refresher = RefreshScheduler.from_env(
+            self.cache, self._refresh_key,
+            is_busy=lambda: self.admission.queue_depth > 0,
+            base_ttl=self.cache_ttl.total_seconds(),
+        )
+        # 进行中的搜索，按缓存键合并并发的相同查询
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.search_stats = {
+            "leader_requests": 0,
+            "coalesced_requests": 0,
+            "stale_served": 0,
+            "background_refreshes": 0,
+            "backend_fallbacks": 0,
+            "local_answers": 0,
+            "local_fallbacks": 0,
+            "peer_results": 0,
+            "near_duplicate_lookups": 0,
+            "near_duplicate_hits": 0,
+            "retries": 0,
+            "retries_skipped": 0,
+            "budget_exceeded": 0,
+            "hedged_requests": 0,
+            "hedge_wins": 0,
+        }
+        self._register_metrics()
+
+    def _register_metrics(self):
+        """导出时按当前状态计算的指标"""
+        metrics.gauge(
+            "ecloud_searches_in_flight", "Distinct searches currently being scraped",
+            lambda: len(self._inflight),
+        )
+        metrics.gauge(
+            "ecloud_admission_queue_depth", "Searches waiting for a scrape slot",
+            lambda: self.admission.queue_depth,
+        )
+        metrics.gauge(
+            "ecloud_admission_rejections_total", "Searches rejected by admission control",
+            lambda: {
+                "queue_full": self.admission.stats()["rejected_queue_full"],
+                "timeout": self.admission.stats()["rejected_timeout"],
+            },
+            label="reason", kind="counter",
+        )
+        metrics.gauge(
+            "ecloud_cache_hit_ratio", "Result cache hit ratio since start",
+            lambda: self.cache.stats()["hit_ratio"],
+        )
+        metrics.gauge(
+            "ecloud_near_duplicate_hit_ratio",
+            "Share of exact cache misses answered from a near-duplicate cached query",
+            self._near_duplicate_hit_rate,
+        )
+        metrics.gauge(
+            "ecloud_refresh_events_total", "Background refresh scheduler counters",
+            lambda: {
+                key: value for key, value in self.refresher.stats().items()
+                if key in ("refreshes", "refresh_failures", "skipped_budget", "skipped_busy",
+                           "content_changes", "idle_evictions", "peer_refreshes")
+            },
+            label="event", kind="counter",
+        )
+        metrics.gauge(
+            "ecloud_cache_entries", "Entries in the in-memory result cache",
+            lambda: len(self.cache.keys()),
+        )
+        metrics.gauge(
+            "ecloud_search_events_total", "Search coalescing, stale serving and local index counters",
+            lambda: dict(self.search_stats), label="event", kind="counter",
+        )
+        metrics.gauge(
+            "ecloud_backend_failures_total", "Failures per search backend",
+            lambda: {name: stats["failures"] for name, stats in self.backend_stats.items()},
+            label="backend", kind="counter",
+        )
+
+    def _default_backends(self) -> List[SearchBackend]:
+        backends: List[SearchBackend] = []
+        api_url = os.getenv("ECLOUD_SEARCH_API_URL")
+        if api_url:
+            if api_url.startswith("/"):
+                api_url = f"{self.base_url}{api_url}"
+            backends.append(HttpSearchBackend(
+                api_url,
+                self._build_full_url,
+                query_param=os.getenv("ECLOUD_SEARCH_API_QUERY_PARAM", "q"),
+                size_param=os.getenv("ECLOUD_SEARCH_API_SIZE_PARAM", "size") or None,
+                timeout=float(os.getenv("ECLOUD_SEARCH_API_TIMEOUT", "10")),
+            ))
+        backends.append(PlaywrightSearchBackend(
+            self.browser_pool,
+            self.page_loader,
+            self._extract_results,
+            self.search_url,
+            self.timeout,
+        ))
+        return backends
+
+    async def close(self):
+        """释放浏览器池等长期持有的资源"""
+        # 共享的抓取任务不随调用方取消，先取消它们，避免在已关闭的客户端上重试或重新拉起浏览器
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for backend in self.backends:
+            await backend.close()
+        await self.answer_extractor.close()
+        self.cache.close()
+        if self.local_index is not None:
+            self.local_index.close()
+
+    def reload_local_index(self) -> bool:
+        """重新映射索引目录（增量刷新后调用）"""
+        previous = self.local_index
+        self.local_index = LocalIndex.load(DEFAULT_INDEX_DIR)
+        if previous is not None:
+            previous.close()
+        return self.local_index is not None
+
+    def _search_local(self, query: str) -> Optional[List[SearchResult]]:
+        """从本地索引作答，没有索引或置信度不足时返回 None"""
+        if self.local_index is None:
+            return None
+        with span("local_index"):
+            results = self.local_index.search(query, limit=10)
+            if results:
+                results = BatchScorer(query).rank(results)
+                if results[0].score >= self.local_min_confidence:
+                    self.search_stats["local_answers"] += 1
+                    self.logger.info(f"本地索引命中，相关度: {results[0].score:.4f}")
+                    return results
+        self.search_stats["local_fallbacks"] += 1
+        self.logger.debug("本地索引置信度不足，回退到在线搜索")
+        return None
 
     def _get_cache_key(self, query: str) -> str:
-        return query.lower().strip()
+        return normalize_query(query)
 
     def _get_cached_result(self, query: str) -> Optional[List[SearchResult]]:
         cache_key = self._get_cache_key(query)
-        if cache_key in self.cache:
-            timestamp, results = self.cache[cache_key]
-            if datetime.now() - timestamp < self.cache_ttl:
-                return results
-        return None
+        return self.cache.get(cache_key)
+
+    def is_cached(self, query: str) -> bool:
+        """缓存中是否有可直接返回的结果（含陈旧窗口内的结果），不计入命中统计"""
+        return self.cache.get_entry(self._get_cache_key(query), record_stats=False) is not None
+
+    def cache_freshness(self, query: str) -> Optional[Tuple[float, float]]:
+        """缓存结果的 (剩余新鲜秒数, 剩余陈旧窗口秒数)
+
+        精确键未缓存时使用近似查询命中的条目；两者都没有（本地索引作答）时返回 None。
+        """
+        cache_key = self._get_cache_key(query)
+        entry = self.cache.get_entry(cache_key, record_stats=False)
+        if entry is None:
+            entry = self._lookup_near_duplicate(cache_key, record_stats=False)
+        if entry is None:
+            return None
+        now = time.time()
+        fresh = max(0.0, entry.expires_at - now)
+        return fresh, max(0.0, entry.expires_at + entry.stale_ttl - now - fresh)
 
     def _build_full_url(self, result_link: str) -> str:
         """根据不同类型的result_link构建完整的URL"""
@@ -116,82 +343,8 @@ class ECloudSearcher:
         return result_link
 
     def _calculate_similarity(self, query: str, text: str) -> float:
-        """改进的相似度计算，增加多维度匹配"""
-        self.logger.debug(f"计算相似度 - 查询词长度: {len(query)}, 文本长度: {len(text)}")
-        if not text:
-            return 0.0
-        
-        # 预处理文本
-        query = query.lower().strip()
-        text = text.lower().strip()
-        
-        # 1. 精确匹配检查 (20% 权重)
-        exact_match_score = 1.0 if query in text else 0.0
-        
-        # 2. 分词处理和TF-IDF计算 (35% 权重)
-        query_words = set(query.split())
-        text_words = set(text.split())
-        
-        # 计算词频和权重
-        word_weights = {}
-        for word in query_words:
-            # 计算词在文本中的频率
-            word_count = text.count(word)
-            # 长词给予更高权重
-            length_boost = len(word) / len(max(query_words, key=len))
-            word_weights[word] = (1 + (0.5 * word_count)) * length_boost
-        
-        # 计算加权匹配分数
-        common_words = query_words & text_words
-        weighted_matches = sum(word_weights.get(word, 0) for word in common_words)
-        total_weight = sum(word_weights.values()) or 1
-        tfidf_score = weighted_matches / total_weight
-        
-        # 3. 序列匹配 (25% 权重)
-        sequence_score = SequenceMatcher(None, query, text).ratio()
-        
-        # 4. N-gram 匹配 (20% 权重)
-        def get_ngrams(text: str, n: int) -> set:
-            return set(text[i:i+n] for i in range(len(text)-n+1))
-        
-        # 使用bi-grams和tri-grams
-        query_bigrams = get_ngrams(query, 2)
-        text_bigrams = get_ngrams(text, 2)
-        query_trigrams = get_ngrams(query, 3)
-        text_trigrams = get_ngrams(text, 3)
-        
-        bigram_similarity = (
-            len(query_bigrams & text_bigrams) / 
-            (len(query_bigrams | text_bigrams) or 1)
-        )
-        trigram_similarity = (
-            len(query_trigrams & text_trigrams) / 
-            (len(query_trigrams | text_trigrams) or 1)
-        )
-        ngram_score = (bigram_similarity + trigram_similarity) / 2
-        
-        # 计算最终得分
-        final_score = (
-            exact_match_score * 0.20 +
-            tfidf_score * 0.35 +
-            sequence_score * 0.25 +
-            ngram_score * 0.20
-        )
-        
-        # 根据文本长度进行惩罚
-        length_ratio = min(len(text) / len(query), 5.0) / 5.0
-        final_score *= (0.8 + 0.2 * length_ratio)
-        
-        self.logger.debug(
-            f"相似度计算结果:\n"
-            f"- 精确匹配得分: {exact_match_score:.4f}\n"
-            f"- TF-IDF得分: {tfidf_score:.4f}\n"
-            f"- 序列匹配得分: {sequence_score:.4f}\n"
-            f"- N-gram得分: {ngram_score:.4f}\n"
-            f"- 最终得分: {final_score:.4f}"
-        )
-        
-        return final_score
+        """单条文本的相似度，批量场景请直接使用 BatchScorer"""
+        return BatchScorer(query).score(text)
 
     async def _extract_result_details(self, result_element) -> SearchResult:
         """提取搜索结果的详细信息"""
@@ -217,7 +370,7 @@ class ECloudSearcher:
                         if title:  # 如果找到有效标题就退出循环
                             break
                 except Exception as e:
-                    self.logger.debug(f"使用选择器 {selector} 提取标题失败: {str(e)}")
+                    self.logger.debug("使用选择器 %s 提取标题失败: %s", selector, e)
                     continue
                     
             if not title:
@@ -242,7 +395,7 @@ class ECloudSearcher:
                         if content:  # 如果找到有效内容就退出循环
                             break
                 except Exception as e:
-                    self.logger.debug(f"使用选择器 {selector} 提取内容失败: {str(e)}")
+                    self.logger.debug("使用选择器 %s 提取内容失败: %s", selector, e)
                     continue
                     
             if not content:
@@ -259,7 +412,7 @@ class ECloudSearcher:
                 self.logger.error(f"提取链接失败: {str(e)}")
                 full_url = ""
             
-            self.logger.debug(f"成功提取结果: {title[:30]}...")
+            self.logger.debug("成功提取结果: %.30s...", title)
             return SearchResult(
                 title=title or "无标题",
                 content=content or "无内容",
@@ -275,132 +428,482 @@ class ECloudSearcher:
                 score=0.0
             )
 
-    async def _do_search(self, query: str, max_results: int = 10) -> List[SearchResult]:
-        """执行搜索并返回多个结果"""
-        self.logger.debug(f"开始执行搜索，查询词: {query}, 最大结果数: {max_results}")
-        browser = None  # 初始化browser变量
-        
-        async with async_playwright() as p:
+    async def _extract_results(self, page, max_results: int) -> List[SearchResult]:
+        """一次 page.evaluate 批量提取结果，失败时回退到逐元素提取"""
+        try:
+            items = await self.extractor.extract(page, max_results)
+            return [
+                SearchResult(
+                    title=item["title"] or "无标题",
+                    content=item["content"] or "无内容",
+                    url=self._build_full_url(item["href"]) if item["href"] else "",
+                    score=0.0
+                )
+                for item in items
+            ]
+        except Exception as e:
+            self.logger.warning(f"批量提取失败，回退到逐元素提取: {str(e)}")
+
+        results = []
+        for selector in RESULT_SELECTORS:
+            if await page.locator(selector).count() > 0:
+                elements = await page.locator(selector).all()
+                # 只获取指定数量的结果
+                results = elements[:max_results]
+                break
+        return [await self._extract_result_details(result) for result in results]
+
+    async def _fetch_results(
+        self,
+        query: str,
+        max_results: int,
+        deadline: Optional[float] = None,
+        on_first: Optional[Callable[[SearchResult], None]] = None,
+    ) -> List[SearchResult]:
+        """依次尝试各搜索后端，前一个失败或响应无法解析时回退到下一个
+
+        on_first 不为空时使用后端的 search_progressive，首个结果可能在全部结果之前回调。
+        """
+        last_error: Optional[Exception] = None
+        for index, backend in enumerate(self.backends):
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError("超出时间预算")
+            if index > 0:
+                self.search_stats["backend_fallbacks"] += 1
             try:
-                # 添加浏览器安装检查
-                try:
-                    browser = await p.chromium.launch(headless=True)
-                except Exception as browser_error:
-                    self.logger.error("浏览器启动失败，尝试安装浏览器")
-                    import subprocess
-                    try:
-                        subprocess.run(["python3", "-m", "playwright", "install", "chromium"])
-                    except Exception as e:
-                        self.logger.error(f"安装 Playwright 失败: {e}")
-                        raise
-                    browser = await p.chromium.launch(headless=True)
-                
-                self.logger.debug("浏览器已启动")
-                
-                context = await browser.new_context()
-                page = await context.new_page()
-                
-                encoded_query = quote(query)
-                search_page_url = f"{self.search_url}?q={encoded_query}"
-                self.logger.info(f"访问搜索页面: {search_page_url}")
-                
-                await page.goto(search_page_url, timeout=self.timeout)
-                await page.wait_for_load_state("networkidle")
-                self.logger.debug("页面加载完成")
-                
-                selectors = [
-                    ".search-result-item",
-                    ".result-item",
-                    ".search-list li",
-                    ".list-item",
-                    "div[class*='result']"
-                ]
-                
-                results = []
-                for selector in selectors:
-                    if await page.locator(selector).count() > 0:
-                        elements = await page.locator(selector).all()
-                        # 只获取指定数量的结果
-                        results = elements[:max_results]
-                        break
-                
-                if not results:
-                    self.logger.info("未找到相关结果")
-                    return [SearchResult(
-                        title="未找到相关结果",
-                        content="",
-                        url="",
-                        score=0.0
-                    )]
-                
-                self.logger.info(f"找到 {len(results)} 个搜索结果")
-                # 获取详细结果并计算相关性得分
-                search_results = []
-                for result in results:
-                    result_details = await self._extract_result_details(result)
-                    
-                    # 分别计算标题和内容的相关性得分
-                    title_score = self._calculate_similarity(query, result_details.title)
-                    content_score = self._calculate_similarity(query, result_details.content)
-                    
-                    # 根据内容长度调整内容得分权重
-                    content_length = len(result_details.content)
-                    if content_length < 50:  # 内容过短可能不够相关
-                        content_weight = 0.2
-                    elif content_length > 500:  # 内容较长可能更相关
-                        content_weight = 0.4
+                with span(f"backend_{backend.name}"):
+                    if on_first is not None:
+                        results = await backend.search_progressive(query, max_results, remaining, on_first)
                     else:
-                        content_weight = 0.3
-                        
-                    # 计算综合得分
-                    title_weight = 1 - content_weight
-                    result_details.score = (title_score * title_weight + 
-                                          content_score * content_weight)
-                    
-                    search_results.append(result_details)
-                
-                # 按相关性得分排序
-                search_results.sort(key=lambda x: x.score, reverse=True)
-                return search_results
-                
+                        results = await backend.search(query, max_results, remaining)
+                self.backend_stats[backend.name]["successes"] += 1
+                return results
             except Exception as e:
-                self.logger.error(f"搜索过程出错: {str(e)}", exc_info=True)
+                self.backend_stats[backend.name]["failures"] += 1
+                last_error = e
+                self.logger.warning(f"{backend.name} 搜索后端失败: {str(e)}")
+        raise last_error
+
+    async def _do_search(
+        self,
+        query: str,
+        max_results: int = 10,
+        on_result: Optional[Callable[[SearchResult], None]] = None,
+        deadline: Optional[float] = None,
+    ) -> List[SearchResult]:
+        """执行搜索并返回多个结果，on_result 在每个结果打分后回调
+
+        后端能更早拿到首个结果时（浏览器后端在页面加载完成前），先对它打分并回调，
+        全部结果提取后不再重复回调同一结果。
+        deadline 为 time.monotonic() 时间点，各后端按剩余时间设置超时。
+        """
+        self.logger.debug("开始执行搜索，查询词: %s, 最大结果数: %d", query, max_results)
+
+        on_first = None
+        if on_result is not None:
+            sent = set()
+
+            def on_first(result: SearchResult):
+                sent.add((result.title, result.url))
+                BatchScorer(query).rank([result], on_result)
+
+            def on_scored(result: SearchResult):
+                if (result.title, result.url) not in sent:
+                    on_result(result)
+        else:
+            on_scored = None
+
+        try:
+            search_results = await self._fetch_results(query, max_results, deadline, on_first)
+
+            if not search_results:
+                self.logger.info("未找到相关结果")
                 return [SearchResult(
-                    title=f"搜索出错: {str(e)}",
+                    title=NO_RESULT_TITLE,
                     content="",
                     url="",
                     score=0.0
                 )]
-            finally:
-                if browser:
-                    await browser.close()
-                    self.logger.debug("浏览器已关闭")
 
-    async def search(self, query: str, max_retries: int = 3) -> List[SearchResult]:
-        """添加重试机制的搜索方法"""
+            self.logger.info(f"找到 {len(search_results)} 个搜索结果")
+            # 查询只预处理一次，批量计算相关性得分并排序
+            with span("scoring"):
+                return BatchScorer(query).rank(search_results, on_scored)
+
+        except Exception as e:
+            self.logger.error(f"搜索过程出错: {str(e)}", exc_info=True)
+            return self._error_result(str(e))
+
+    @staticmethod
+    def _error_result(message: str) -> List[SearchResult]:
+        return [SearchResult(
+            title=f"{ERROR_TITLE_PREFIX}: {message}",
+            content="",
+            url="",
+            score=0.0
+        )]
+
+    async def search(
+        self, query: str, max_retries: int = 3, budget: Optional[float] = None
+    ) -> List[SearchResult]:
+        """添加重试机制的搜索方法，相同查询并发时只执行一次抓取
+
+        budget 为本次请求的时间预算（秒），默认 ECLOUD_SEARCH_BUDGET；超出时返回错误结果。
+        """
         self.logger.info(f"开始搜索: {query}")
-        cached_result = self._get_cached_result(query)
-        if cached_result:
-            return cached_result
+        budget = self.search_budget if budget is None else budget
+        deadline = time.monotonic() + budget
+        cache_key = self._get_cache_key(query)
+        with span("cache_lookup"):
+            entry = self.cache.get_entry(cache_key)
+        if entry is not None:
+            if not entry.is_fresh():
+                # 先返回过期结果，再在后台刷新
+                self.search_stats["stale_served"] += 1
+                _, is_new = self._start_search(cache_key, query, max_retries, deadline=deadline)
+                if is_new:
+                    self.search_stats["background_refreshes"] += 1
+                    self.logger.debug("返回过期缓存并后台刷新: %s", cache_key)
+            self._note_cache_hit(query, entry.value)
+            return entry.value
 
-        for attempt in range(max_retries):
+        with span("near_duplicate_lookup"):
+            near = self._lookup_near_duplicate(cache_key)
+        if near is not None:
+            return near.value
+
+        task, is_new = self._start_search(cache_key, query, max_retries, deadline=deadline)
+        if is_new:
+            self.search_stats["leader_requests"] += 1
+        else:
+            self.search_stats["coalesced_requests"] += 1
+            self.logger.debug("合并到进行中的搜索: %s", cache_key)
+
+        # shield 保证单个调用方被取消或超时时不会取消共享的抓取任务
+        with span("search_wait" if is_new else "search_coalesced_wait"):
             try:
-                results = await self._do_search(query)
-                cache_key = self._get_cache_key(query)
-                self.cache[cache_key] = (datetime.now(), results)
+                return await asyncio.wait_for(
+                    asyncio.shield(task), max(0.0, deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                # 合并到的抓取任务可能按更长的预算运行，本请求不再等待
+                self.search_stats["budget_exceeded"] += 1
+                self.logger.warning(f"搜索超出时间预算 ({budget:.1f}秒): {query}")
+                return self._error_result(f"超出时间预算 ({budget:.1f}秒)")
+
+    def _start_search(
+        self,
+        cache_key: str,
+        query: str,
+        max_retries: int,
+        on_result: Optional[Callable[[SearchResult], None]] = None,
+        deadline: Optional[float] = None,
+        force: bool = False,
+    ) -> Tuple[asyncio.Task, bool]:
+        """返回该缓存键上进行中的抓取任务，没有则新建（仅新建时使用 on_result、deadline 和 force）"""
+        task = self._inflight.get(cache_key)
+        if task is not None:
+            return task, False
+        if deadline is None:
+            deadline = time.monotonic() + self.search_budget
+        task = asyncio.create_task(
+            self._search_and_cache(query, max_retries, on_result, deadline, force)
+        )
+        self._inflight[cache_key] = task
+        task.add_done_callback(lambda t: self._on_search_done(cache_key, t))
+        return task, True
+
+    def _on_search_done(self, cache_key: str, task: asyncio.Task):
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+        # 所有等待者都已取消时，避免出现未获取异常的警告
+        if not task.cancelled():
+            task.exception()
+
+    async def _search_and_cache(
+        self,
+        query: str,
+        max_retries: int,
+        on_result: Optional[Callable[[SearchResult], None]] = None,
+        deadline: Optional[float] = None,
+        force: bool = False,
+    ) -> List[SearchResult]:
+        """抓取并写入缓存；force 时即使共享缓存中已有新鲜结果也重新抓取（后台定时刷新）"""
+        if deadline is None:
+            deadline = time.monotonic() + self.search_budget
+        cache_key = self._get_cache_key(query)
+        if not self.cache.try_claim(cache_key, self.claim_ttl):
+            # 其他 worker 进程正在抓取同一查询，等待它写入共享缓存
+            self.logger.debug("其他进程正在抓取，等待共享缓存: %s", cache_key)
+            results = await self._wait_for_peer(cache_key, time.time(), deadline)
+            if results is not None:
+                self.search_stats["peer_results"] += 1
+                self._note_cache_hit(query, results)
                 return results
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    self.logger.error(f"搜索失败，已重试{max_retries}次: {str(e)}", exc_info=True)
+            self.cache.try_claim(cache_key, self.claim_ttl)
+        elif self.cache.shared and not force:
+            # 占用成功前其他进程可能刚刚写入了新结果
+            entry = self.cache.get_entry(cache_key, record_stats=False)
+            if entry is not None and entry.is_fresh():
+                self.cache.release_claim(cache_key)
+                self.search_stats["peer_results"] += 1
+                self._note_cache_hit(query, entry.value)
+                return entry.value
+
+        try:
+            results: List[SearchResult] = []
+            for attempt in range(max_retries):
+                try:
+                    results = await self._attempt(query, deadline, on_result)
+                except AdmissionRejected:
+                    # 繁忙时不重试、不缓存，交给调用方返回 503
                     raise
-                await asyncio.sleep(1 * (attempt + 1))  # 指数退避
+                except asyncio.TimeoutError:
+                    self.search_stats["budget_exceeded"] += 1
+                    results = self._error_result("超出时间预算")
+                except Exception as e:
+                    self.logger.warning(f"第 {attempt + 1} 次搜索失败: {str(e)}")
+                    results = self._error_result(str(e))
+
+                if not self._is_error_result(results):
+                    break
+                if attempt == max_retries - 1:
+                    self.logger.error(f"搜索失败，已重试{max_retries}次: {results[0].title}")
+                    break
+                backoff = 1 * (attempt + 1)  # 线性退避
+                if not self._retry_fits(deadline, backoff):
+                    self.search_stats["retries_skipped"] += 1
+                    self.logger.warning(f"剩余时间预算不足，放弃重试: {query}")
+                    break
+                self.search_stats["retries"] += 1
+                search_retries.inc()
+                await asyncio.sleep(backoff)
+
+            self._store_results(cache_key, results, query)
+            return results
+        finally:
+            self.cache.release_claim(cache_key)
+
+    async def _attempt(
+        self,
+        query: str,
+        deadline: float,
+        on_result: Optional[Callable[[SearchResult], None]] = None,
+    ) -> List[SearchResult]:
+        """一次抓取尝试；开启对冲时，超过近期 p95 仍未完成则并行发起第二次，先拿到有效结果者胜出"""
+        first = asyncio.create_task(self._timed_search(query, deadline, on_result))
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None or hedge_delay >= deadline - time.monotonic():
+            try:
+                return await first
+            finally:
+                first.cancel()
+
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done:
+                return first.result()
+
+            self.search_stats["hedged_requests"] += 1
+            self.logger.info(f"首次抓取超过 p95 ({hedge_delay:.2f}秒)，发起对冲请求: {query}")
+            hedge = asyncio.create_task(self._timed_search(query, deadline))
+            tasks.add(hedge)
+            fallback: Optional[List[SearchResult]] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        continue
+                    results = task.result()
+                    if not self._is_error_result(results):
+                        if task is hedge:
+                            self.search_stats["hedge_wins"] += 1
+                        return results
+                    fallback = fallback or results
+            if fallback is not None:
+                return fallback
+            return first.result()
+        finally:
+            # 取消落败的尝试，其租借的页面在 lease() 退出时关闭
+            for task in tasks:
+                task.cancel()
+
+    async def _timed_search(
+        self,
+        query: str,
+        deadline: float,
+        on_result: Optional[Callable[[SearchResult], None]] = None,
+    ) -> List[SearchResult]:
+        """在抓取名额和剩余预算内执行一次 _do_search，并记录成功抓取的耗时"""
+        async with self.admission.slot(deadline=min(deadline, time.monotonic() + self.admission.queue_timeout)):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError("超出时间预算")
+            start = time.monotonic()
+            results = await asyncio.wait_for(
+                self._do_search(query, on_result=on_result, deadline=deadline), remaining
+            )
+            if not self._is_error_result(results):
+                self._attempt_durations.append(time.monotonic() - start)
+            return results
+
+    def _duration_percentile(self, pct: float) -> Optional[float]:
+        if not self._attempt_durations:
+            return None
+        ordered = sorted(self._attempt_durations)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge_enabled or len(self._attempt_durations) < HEDGE_MIN_SAMPLES:
+            return None
+        return self._duration_percentile(95)
+
+    def _retry_fits(self, deadline: float, backoff: float) -> bool:
+        """退避之后的剩余预算是否还够一次典型（p50）耗时的抓取"""
+        expected = self._duration_percentile(50) or 0.0
+        return deadline - time.monotonic() - backoff > expected
+
+    async def _wait_for_peer(
+        self, cache_key: str, since: float, deadline: Optional[float] = None
+    ) -> Optional[List[SearchResult]]:
+        """轮询共享缓存，直到出现 since 之后写入的结果；对方放弃或占用过期时返回 None"""
+        deadline = min(deadline or float("inf"), time.monotonic() + self.claim_ttl)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(PEER_POLL_INTERVAL)
+            entry = self.cache.get_entry(cache_key, record_stats=False)
+            if entry is not None and entry.stored_at >= since:
+                return entry.value
+            if not self.cache.is_claimed(cache_key):
+                break
+        return None
+
+    @staticmethod
+    def _is_error_result(results: List[SearchResult]) -> bool:
+        return len(results) == 1 and results[0].title.startswith(ERROR_TITLE_PREFIX)
+
+    @staticmethod
+    def _is_empty_result(results: List[SearchResult]) -> bool:
+        return not results or (len(results) == 1 and results[0].title == NO_RESULT_TITLE)
+
+    def _store_results(
+        self, cache_key: str, results: List[SearchResult], query: Optional[str] = None
+    ):
+        """按结果类型选择 TTL 写入缓存，错误结果不覆盖仍可用的旧结果"""
+        if self._is_error_result(results):
+            previous = self.cache.get_entry(cache_key, record_stats=False)
+            if previous is not None and not self._is_error_result(previous.value):
+                self.logger.info(f"刷新失败，保留旧的缓存结果: {cache_key}")
+                # 旧结果按错误 TTL 续期，避免每个请求都立即重试刷新
+                remaining_stale = previous.expires_at + previous.stale_ttl - time.time()
+                self.cache.set(
+                    cache_key, previous.value,
+                    self.error_cache_ttl.total_seconds(), max(0.0, remaining_stale),
+                )
+                return
+            self.cache.set(cache_key, results, self.error_cache_ttl.total_seconds(), 0)
+        elif self._is_empty_result(results):
+            self.cache.set(cache_key, results, self.empty_cache_ttl.total_seconds(), 0)
+        else:
+            ttl = self.refresher.ttl_for(cache_key, query or cache_key, results)
+            entry = self.cache.set(cache_key, results, ttl, self.stale_ttl.total_seconds())
+            self.refresher.record_store(cache_key, entry.stored_at)
+            self.suggestions.record(query or cache_key, [r.title for r in results])
+            self.near_duplicates.add(cache_key)
+
+    def _note_cache_hit(self, query: str, results: List[SearchResult]):
+        """缓存命中时累加建议热度；重启后尚未登记的缓存结果在首次命中时补登到建议和近似索引"""
+        usable = not self._is_error_result(results) and not self._is_empty_result(results)
+        if self.suggestions.has_query(query):
+            self.suggestions.touch(query)
+        elif usable:
+            self.suggestions.record(query, [r.title for r in results])
+        if usable:
+            cache_key = self._get_cache_key(query)
+            self.near_duplicates.add(cache_key)
+            self.refresher.record_hit(cache_key)
+
+    def _lookup_near_duplicate(self, cache_key: str, record_stats: bool = True) -> Optional[CacheEntry]:
+        """精确未命中时查找足够相近的已缓存查询，只复用未过期的有效结果
+
+        record_stats=False 时只查询，不计入命中统计和热度（如计算 HTTP 缓存头）。
+        """
+        if not self.near_duplicates.enabled:
+            return None
+        if record_stats:
+            self.search_stats["near_duplicate_lookups"] += 1
+        match = self.near_duplicates.find(cache_key)
+        if match is None:
+            return None
+        near_key, similarity = match
+        entry = self.cache.get_entry(near_key, record_stats=False)
+        if entry is None:
+            # 已被淘汰或清除，顺手移出索引
+            self.near_duplicates.remove(near_key)
+            return None
+        if not entry.is_fresh() or self._is_error_result(entry.value) or self._is_empty_result(entry.value):
+            return None
+        if not record_stats:
+            return entry
+        self.search_stats["near_duplicate_hits"] += 1
+        self.refresher.record_hit(near_key)
+        self.logger.info("近似查询命中缓存: %s -> %s (相似度 %.2f)", cache_key, near_key, similarity)
+        return entry
+
+    async def _refresh_key(self, cache_key: str, query: str) -> bool:
+        """后台刷新一个缓存键，与用户请求共用合并、跨进程占用和准入控制
+
+        只有本次确实写入了新结果才返回 True；等到其他进程的结果或抓取失败都算未刷新。
+        """
+        stores = self.refresher.stores(cache_key)
+        task, _ = self._start_search(cache_key, query, max_retries=1, force=True)
+        try:
+            await asyncio.shield(task)
+        except AdmissionRejected:
+            return False
+        return self.refresher.stores(cache_key) > stores
+
+    def _near_duplicate_hit_rate(self) -> float:
+        lookups = self.search_stats["near_duplicate_lookups"]
+        return self.search_stats["near_duplicate_hits"] / lookups if lookups else 0.0
 
-    async def get_best_answer(self, query: str) -> dict:
-        """获取最佳答案并分析"""
+    def get_search_stats(self) -> Dict[str, object]:
+        return {
+            **self.search_stats,
+            "in_flight": len(self._inflight),
+            "search_budget": self.search_budget,
+            "hedge_enabled": self.hedge_enabled,
+            "attempt_p50": self._duration_percentile(50),
+            "attempt_p95": self._duration_percentile(95),
+            "admission": self.admission.stats(),
+            "answer_extraction": self.answer_extractor.stats(),
+            "suggestions": self.suggestions.stats(),
+            "near_duplicate": {
+                **self.near_duplicates.stats(),
+                "lookups": self.search_stats["near_duplicate_lookups"],
+                "hits": self.search_stats["near_duplicate_hits"],
+                "hit_rate": self._near_duplicate_hit_rate(),
+            },
+            "refresh": self.refresher.stats(),
+            "backends": self.backend_stats,
+            "page_load": self.page_loader.stats(),
+        }
+
+    async def get_best_answer(self, query: str, budget: Optional[float] = None) -> dict:
+        """获取最佳答案并分析，budget 为在线搜索的时间预算（秒）"""
         self.logger.info(f"开始获取最佳答案，查询词: {query}")
         start_time = datetime.now()
         
-        search_results = await self.search(query)
+        budget = self.search_budget if budget is None else budget
+        # 在线搜索和段落提取共用同一个请求预算
+        deadline = time.monotonic() + budget
+        with span("get_best_answer"):
+            search_results = self._search_local(query)
+            if search_results is None:
+                search_results = await self.answer_extractor.apply(
+                    query, await self.search(query, budget=budget), deadline
+                )
         best_result = search_results[0] if search_results else None
         
         if best_result:
@@ -413,7 +916,10 @@ class ECloudSearcher:
             
         processing_time = (datetime.now() - start_time).total_seconds()
         self.logger.info(f"处理完成，耗时: {processing_time:.2f}秒")
-        
+        return self._build_answer(query, search_results)
+
+    def _build_answer(self, query: str, search_results: List[SearchResult]) -> dict:
+        best_result = search_results[0] if search_results else None
         analyzed_result = {
             "question": query,
             "answer": best_result.content if best_result else "未找到相关结果",
@@ -430,6 +936,115 @@ class ECloudSearcher:
         }
         return analyzed_result
 
+    async def search_events(
+        self, query: str, max_retries: int = 3, budget: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """流式搜索：依次产生 (事件名, 数据)
+
+        先产生 status 事件（local_index / cache_hit / searching / coalesced），
+        抓取时每个结果打分后产生 result 事件，最后产生排序后的 answer 事件。
+        浏览器后端在结果容器出现时先提取首个结果，不等页面加载完成；其余结果在批量提取后一起到达。
+        """
+        self.logger.info(f"开始流式搜索: {query}")
+        local_results = self._search_local(query)
+        if local_results is not None:
+            yield "status", {"status": "local_index"}
+            yield "answer", self._build_answer(query, local_results)
+            return
+
+        budget = self.search_budget if budget is None else budget
+        deadline = time.monotonic() + budget
+        cache_key = self._get_cache_key(query)
+        entry = self.cache.get_entry(cache_key, record_stats=False)
+        if entry is not None:
+            yield "status", {"status": "cache_hit", "stale": not entry.is_fresh()}
+            # 通过 search() 记录命中统计，并在结果过期时触发后台刷新
+            results = await self.search(query, max_retries, budget)
+            results = await self.answer_extractor.apply(query, results, deadline)
+            yield "answer", self._build_answer(query, results)
+            return
+        near = self._lookup_near_duplicate(cache_key)
+        if near is not None:
+            yield "status", {"status": "cache_hit", "stale": False, "near_duplicate": True}
+            results = await self.answer_extractor.apply(query, near.value, deadline)
+            yield "answer", self._build_answer(query, results)
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        task, is_new = self._start_search(cache_key, query, max_retries, queue.put_nowait, deadline)
+        if is_new:
+            self.search_stats["leader_requests"] += 1
+        else:
+            # 合并到别的请求发起的抓取，只能等待最终结果
+            self.search_stats["coalesced_requests"] += 1
+        yield "status", {"status": "searching" if is_new else "coalesced"}
+
+        waiter = asyncio.ensure_future(asyncio.shield(task))
+        getter: Optional[asyncio.Future] = None
+        try:
+            while not waiter.done():
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield "result", asdict(getter.result())
+                else:
+                    getter.cancel()
+            while not queue.empty():
+                yield "result", asdict(queue.get_nowait())
+            results = await self.answer_extractor.apply(query, await waiter, deadline)
+            yield "answer", self._build_answer(query, results)
+        finally:
+            # 客户端断开时只停止等待，共享的抓取任务继续执行并写入缓存
+            for future in (getter, waiter):
+                if future is not None and not future.done():
+                    future.cancel()
+
+def read_bulk_queries(stream: TextIO) -> List[dict]:
+    """读取批量查询：每行一个查询，或 JSONL（query 字段，其余字段原样带到输出）
+
+    每条查询带上 row（输入中的行号），用于输出和断点续跑。
+    """
+    items = []
+    for row, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        item = {"query": line}
+        if line.startswith("{"):
+            try:
+                data = json.loads(line)
+                item = {**data, "query": str(data.get("query", "")).strip()}
+            except ValueError:
+                pass
+        if item["query"]:
+            item["row"] = row
+            items.append(item)
+    return items
+
+
+def bulk_row_key(record: dict) -> str:
+    """批量输入中一行的标识：带 id 字段时用 id，否则用行号"""
+    if record.get("id") is not None:
+        return f"id:{record['id']}"
+    return f"row:{record.get('row')}"
+
+
+def load_completed(path: str) -> Set[str]:
+    """已成功写入输出文件的输入行（bulk_row_key），中断时最后一行可能不完整，跳过即可"""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                completed.add(bulk_row_key(record))
+    return completed
+
+
 class ECloudSearcherCLI:
     def __init__(self):
         self.console = Console()
@@ -498,17 +1113,134 @@ class ECloudSearcherCLI:
                 self.logger.error(f"搜索出错: {str(e)}", exc_info=True)
                 self.console.print(f"[bold red]错误: {str(e)}[/bold red]")
 
+    async def bulk_mode(
+        self,
+        input_path: str,
+        output_path: str = "-",
+        concurrency: int = 4,
+        resume: bool = False,
+    ):
+        """批量模式：并发回答文件或标准输入中的查询，完成一条就写出一行 JSONL
+
+        相同查询（按缓存键）只搜索一次，但每个输入行都输出一条记录。
+        resume 时跳过输出文件中已成功的行（按 id 或行号）并追加写入。
+        """
+        logging_pipeline.quiet_console()
+        if input_path == "-":
+            items = read_bulk_queries(sys.stdin)
+        else:
+            with open(input_path, encoding="utf-8") as f:
+                items = read_bulk_queries(f)
+
+        to_stdout = output_path == "-"
+        completed = load_completed(output_path) if resume and not to_stdout else set()
+        pending = [item for item in items if bulk_row_key(item) not in completed]
+        # 按缓存键分组，每组只搜索一次，结果写给组内每一行
+        groups: Dict[str, List[dict]] = {}
+        for item in pending:
+            groups.setdefault(self.searcher._get_cache_key(item["query"]), []).append(item)
+        # 进度条和日志走 stderr，避免混入标准输出的 JSONL
+        console = Console(stderr=True)
+        console.print(
+            f"查询 {len(items)} 条，已完成 {len(items) - len(pending)} 条，"
+            f"待处理 {len(pending)} 条（去重后 {len(groups)} 次搜索）"
+        )
+        if not pending:
+            return
+
+        if to_stdout:
+            out = sys.stdout
+        else:
+            out = open(output_path, "a" if resume else "w", encoding="utf-8")
+            # 上次中断时可能留下半行，先补上换行
+            if resume and out.tell() > 0:
+                with open(output_path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        out.write("\n")
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for group in groups.values():
+            queue.put_nowait(group)
+        counts = {"ok": 0, "error": 0, "cached": 0}
+
+        with Progress(
+            TextColumn("[cyan]批量搜索"),
+            BarColumn(),
+            TextColumn("{task.completed}/{task.total}"),
+            TextColumn("成功 {task.fields[ok]} / 失败 {task.fields[error]} / 缓存 {task.fields[cached]}"),
+            TimeRemainingColumn(),
+            console=console,
+        ) as progress:
+            task = progress.add_task("bulk", total=len(pending), ok=0, error=0, cached=0)
+
+            async def worker():
+                while True:
+                    try:
+                        group = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    outcome = await self._answer_bulk_item(group[0]["query"])
+                    for item in group:
+                        out.write(json.dumps({**item, **outcome}, ensure_ascii=False) + "\n")
+                    out.flush()
+                    counts[outcome["status"]] += len(group)
+                    counts["cached"] += outcome["cached"] * len(group)
+                    progress.update(task, advance=len(group), **counts)
+
+            try:
+                await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+            except asyncio.CancelledError:
+                console.print(
+                    f"[yellow]已中断，完成 {counts['ok'] + counts['error']}/{len(pending)} 条，"
+                    f"使用 --resume 从中断处继续[/yellow]"
+                )
+                raise
+            finally:
+                if not to_stdout:
+                    out.close()
+        console.print(
+            f"完成 - 成功: {counts['ok']}, 失败: {counts['error']}, 命中缓存: {counts['cached']}"
+        )
+
+    async def _answer_bulk_item(self, query: str) -> dict:
+        """回答一条查询，返回写入输出的状态字段（不含输入行的字段）"""
+        cached = self.searcher.is_cached(query)
+        start = time.monotonic()
+        while True:
+            try:
+                result = await self.searcher.get_best_answer(query)
+                break
+            except AdmissionRejected as e:
+                # 离线批量不丢弃查询，按建议的间隔重新排队
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                logger.error(f"批量查询失败 {query}: {str(e)}")
+                return {"status": "error", "cached": cached, "error": str(e),
+                        "elapsed": round(time.monotonic() - start, 3)}
+        record = {"status": "ok", "cached": cached, "result": result,
+                  "elapsed": round(time.monotonic() - start, 3)}
+        if result["title"].startswith(ERROR_TITLE_PREFIX):
+            record.update(status="error", error=result["title"])
+        return record
+
 async def main():
     # 创建命令行参数解析器
     parser = argparse.ArgumentParser(description='移动云帮助中心搜索工具')
     parser.add_argument('-q', '--query', help='要搜索的问题')
     parser.add_argument('-i', '--interactive', action='store_true', help='启动交互式模式')
+    parser.add_argument('-f', '--file', help='批量模式：查询文件（每行一个查询或 JSONL），- 表示标准输入')
+    parser.add_argument('-o', '--output', default='-', help='批量模式的 JSONL 输出文件，默认标准输出')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='批量模式的并发数')
+    parser.add_argument('--resume', action='store_true', help='跳过输出文件中已成功的行并追加写入')
     args = parser.parse_args()
     
     cli = ECloudSearcherCLI()
     
     try:
-        if args.interactive or not args.query:
+        if args.file:
+            await cli.bulk_mode(args.file, args.output, args.concurrency, args.resume)
+        elif args.interactive or not args.query:
             await cli.interactive_mode()
         else:
             with Progress() as progress:
@@ -519,6 +1251,11 @@ async def main():
             
     except Exception as e:
         cli.console.print(f"[bold red]错误: {str(e)}[/bold red]")
+    finally:
+        await cli.searcher.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
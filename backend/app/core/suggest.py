@@ -0,0 +1,195 @@
+import bisect
+import heapq
+import math
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from itertools import chain
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+# 前缀匹配最多展开的候选数，保证热门前缀下仍是常数级耗时
+MAX_PREFIX_CANDIDATES = 200
+# n-gram 匹配至少覆盖输入中这一比例的片段才算候选
+MIN_GRAM_OVERLAP = 0.5
+# 每条查询额外收录的结果标题数
+TITLES_PER_QUERY = 3
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _SPACE_RE.sub(" ", text.lower()).strip()
+
+
+def ngrams(text: str, n: int = 2) -> Set[str]:
+    """去掉空格后的字符 n-gram，中文无需分词；短于 n 的文本整体作为一个片段"""
+    compact = text.replace(" ", "")
+    if len(compact) <= n:
+        return {compact} if compact else set()
+    return {compact[i:i + n] for i in range(len(compact) - n + 1)}
+
+
+@dataclass
+class Suggestion:
+    text: str
+    # 选中后实际发起的查询：标题条目指向产生它的那条已缓存查询
+    query: str
+    kind: str  # query / title
+    popularity: int = 0
+    last_used: float = 0.0
+
+
+class SuggestIndex:
+    """已回答查询和结果标题的内存前缀 / n-gram 索引，按热度加权排序
+
+    只在事件循环中读写，更新是增量的：写入新结果时加入条目，命中缓存时累加热度。
+    """
+
+    def __init__(self, max_entries: int = 5000, max_results: int = 8):
+        self.max_entries = max(1, max_entries)
+        self.max_results = max_results
+        self._entries: Dict[str, Suggestion] = {}
+        # 有序键列表，二分查找前缀
+        self._sorted_keys: List[str] = []
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+        self._stats = {"lookups": 0, "added": 0, "evicted": 0}
+
+    @classmethod
+    def from_env(cls) -> "SuggestIndex":
+        return cls(
+            max_entries=int(os.getenv("ECLOUD_SUGGEST_MAX_ENTRIES", "5000")),
+            max_results=int(os.getenv("ECLOUD_SUGGEST_MAX_RESULTS", "8")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, query: str, titles: List[str] = ()):
+        """登记一次已回答的查询及其结果标题"""
+        now = time.time()
+        entry = self._add(query, query, "query", now)
+        if entry is None:
+            return
+        entry.popularity += 1
+        for title in titles[:TITLES_PER_QUERY]:
+            title_entry = self._add(title, query, "title", now)
+            if title_entry is not None and title_entry.kind == "title":
+                title_entry.query = query
+        if len(self._entries) > self.max_entries:
+            self._evict()
+
+    def has_query(self, query: str) -> bool:
+        entry = self._entries.get(normalize(query))
+        return entry is not None and entry.kind == "query"
+
+    def touch(self, query: str):
+        """缓存命中时累加热度，不存在的查询忽略"""
+        entry = self._entries.get(normalize(query))
+        if entry is not None:
+            entry.popularity += 1
+            entry.last_used = time.time()
+
+    def _add(self, text: str, query: str, kind: str, now: float) -> Optional[Suggestion]:
+        key = normalize(text)
+        if not key:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = Suggestion(text=text.strip(), query=query, kind=kind)
+            self._entries[key] = entry
+            bisect.insort(self._sorted_keys, key)
+            for gram in ngrams(key):
+                self._grams[gram].add(key)
+            self._stats["added"] += 1
+        elif kind == "query" and entry.kind == "title":
+            # 用户直接搜过的文本优先按查询处理
+            entry.kind = "query"
+            entry.query = query
+        entry.last_used = now
+        return entry
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        index = bisect.bisect_left(self._sorted_keys, key)
+        if index < len(self._sorted_keys) and self._sorted_keys[index] == key:
+            del self._sorted_keys[index]
+        for gram in ngrams(key):
+            keys = self._grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+
+    def _evict(self):
+        """一次淘汰约 10% 热度最低、最久未用的条目，摊薄排序开销"""
+        excess = len(self._entries) - self.max_entries
+        count = max(excess, self.max_entries // 10)
+        victims = sorted(
+            self._entries.items(), key=lambda item: (item[1].popularity, item[1].last_used)
+        )[:count]
+        for key, _ in victims:
+            self._remove(key)
+        self._stats["evicted"] += len(victims)
+
+    def forget(self, query: str):
+        """缓存被清除时移除该查询及指向它的标题条目"""
+        target = normalize(query)
+        for key in [k for k, e in self._entries.items() if normalize(e.query) == target]:
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._sorted_keys.clear()
+        self._grams.clear()
+
+    def suggest(self, prefix: str, limit: Optional[int] = None) -> List[Suggestion]:
+        """返回按 匹配度 × log 热度 排序的建议，前缀匹配优先于片段匹配"""
+        self._stats["lookups"] += 1
+        limit = self.max_results if limit is None else limit
+        key = normalize(prefix)
+        if not key or limit <= 0:
+            return []
+
+        scores: Dict[str, float] = {}
+        start = bisect.bisect_left(self._sorted_keys, key)
+        for candidate in self._sorted_keys[start:start + MAX_PREFIX_CANDIDATES]:
+            if not candidate.startswith(key):
+                break
+            scores[candidate] = 1.0
+
+        grams = ngrams(key)
+        if grams:
+            overlap = Counter(chain.from_iterable(self._grams.get(gram, ()) for gram in grams))
+            min_hits = MIN_GRAM_OVERLAP * len(grams)
+            for candidate, hits in overlap.items():
+                if hits >= min_hits and candidate not in scores:
+                    # 片段匹配最高按 0.9 计，同等热度下排在前缀匹配之后
+                    scores[candidate] = 0.9 * hits / len(grams)
+
+        ranked = []
+        for candidate, score in scores.items():
+            entry = self._entries[candidate]
+            weight = score * (1.0 + math.log1p(self.popularity(entry)))
+            # 同分时查询优先于标题，短的优先
+            ranked.append((-weight, entry.kind != "query", len(candidate), candidate))
+        return [self._entries[item[3]] for item in heapq.nsmallest(limit, ranked)]
+
+    def popularity(self, entry: Suggestion) -> int:
+        """标题条目沿用其查询的热度"""
+        if entry.kind == "title":
+            parent = self._entries.get(normalize(entry.query))
+            if parent is not None:
+                return max(entry.popularity, parent.popularity)
+        return entry.popularity
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "grams": len(self._grams),
+        }
@@ -0,0 +1,179 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from app.core.normalization import normalize_query
+from app.core.scraper.search_automation import LOG_DIR, LOG_FILE_NAME, ECloudSearcher
+
+logger = logging.getLogger('ecloud_searcher')
+
+# 用户发起的查询在日志中的记录（预热本身只调用 search()，不会被重复统计）
+_QUERY_LOG_RE = re.compile(r" - (?:开始获取最佳答案，查询词|开始流式搜索): (.+?)\s*$")
+
+
+def mine_top_queries(log_dir: str = LOG_DIR, limit: int = 50) -> List[str]:
+    """从当前及按天切割的历史日志中统计最常见的查询"""
+    counts: Counter = Counter()
+    # 同一缓存键保留最常见的原始写法
+    spellings: Dict[str, Counter] = {}
+    for path in sorted(glob.glob(os.path.join(log_dir, f"{LOG_FILE_NAME}*"))):
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    match = _QUERY_LOG_RE.search(line)
+                    if not match:
+                        continue
+                    query = match.group(1)
+                    key = normalize_query(query)
+                    if not key:
+                        continue
+                    counts[key] += 1
+                    spellings.setdefault(key, Counter())[query] += 1
+        except OSError as e:
+            logger.warning(f"读取日志失败 {path}: {str(e)}")
+    return [spellings[key].most_common(1)[0][0] for key, _ in counts.most_common(limit)]
+
+
+def load_query_list(path: str, limit: int = 50) -> List[str]:
+    """读取导出的查询列表：每行一个查询，或 JSONL（query 字段）"""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    line = str(json.loads(line).get("query", "")).strip()
+                except ValueError:
+                    pass
+            if line:
+                queries.append(line)
+    return _dedupe(queries)[:limit]
+
+
+def _dedupe(queries: Iterable[str]) -> List[str]:
+    seen = set()
+    unique = []
+    for query in queries:
+        key = normalize_query(query)
+        if key not in seen:
+            seen.add(key)
+            unique.append(query)
+    return unique
+
+
+class Warmup:
+    """服务启动时的预热：预先启动浏览器池，并用热门查询填充结果缓存"""
+
+    def __init__(
+        self,
+        searcher: ECloudSearcher,
+        top_n: int = 50,
+        concurrency: int = 2,
+        query_file: Optional[str] = None,
+        log_dir: str = LOG_DIR,
+        prelaunch: bool = True,
+    ):
+        self.searcher = searcher
+        self.top_n = top_n
+        self.concurrency = max(1, concurrency)
+        self.query_file = query_file
+        self.log_dir = log_dir
+        self.prelaunch = prelaunch
+        self.ready = False
+        self._status = {
+            "started_at": None,
+            "elapsed": 0.0,
+            "browser_pool": "skipped",
+            "queries": 0,
+            "prefilled": 0,
+            "already_cached": 0,
+            "failed": 0,
+        }
+
+    @classmethod
+    def from_env(cls, searcher: ECloudSearcher) -> "Warmup":
+        return cls(
+            searcher,
+            top_n=int(os.getenv("ECLOUD_WARMUP_TOP_N", "50")),
+            concurrency=int(os.getenv("ECLOUD_WARMUP_CONCURRENCY", "2")),
+            query_file=os.getenv("ECLOUD_WARMUP_QUERY_FILE") or None,
+            prelaunch=os.getenv("ECLOUD_WARMUP_PRELAUNCH", "1").lower() in ("1", "true", "yes"),
+        )
+
+    def queries(self) -> List[str]:
+        if self.top_n <= 0:
+            return []
+        if self.query_file:
+            return load_query_list(self.query_file, self.top_n)
+        return mine_top_queries(self.log_dir, self.top_n)
+
+    async def run(self):
+        """执行预热，任何一步失败都只记录日志，最终总会进入就绪状态"""
+        start = time.monotonic()
+        self._status["started_at"] = time.time()
+        try:
+            if self.prelaunch:
+                await self._prelaunch()
+            await self._prefill()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"预热失败: {str(e)}", exc_info=True)
+        finally:
+            self._status["elapsed"] = time.monotonic() - start
+            self.ready = True
+        logger.info(
+            f"预热完成 - 耗时: {self._status['elapsed']:.2f}秒, "
+            f"预填充: {self._status['prefilled']}/{self._status['queries']}, "
+            f"失败: {self._status['failed']}"
+        )
+
+    async def _prelaunch(self):
+        try:
+            await self.searcher.browser_pool.start()
+            self._status["browser_pool"] = "started"
+        except Exception as e:
+            # 浏览器不可用时仍可通过缓存、本地索引和 HTTP 后端提供服务
+            self._status["browser_pool"] = "failed"
+            logger.error(f"预启动浏览器池失败: {str(e)}")
+
+    async def _prefill(self):
+        try:
+            queries = self.queries()
+        except OSError as e:
+            logger.error(f"读取预热查询失败: {str(e)}")
+            return
+        self._status["queries"] = len(queries)
+        if not queries:
+            return
+        logger.info(f"开始预填充缓存: {len(queries)} 个查询")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def prefill(query: str):
+            if self.searcher.is_cached(query):
+                self._status["already_cached"] += 1
+                return
+            async with semaphore:
+                try:
+                    results = await self.searcher.search(query)
+                    if self.searcher._is_error_result(results):
+                        self._status["failed"] += 1
+                    else:
+                        self._status["prefilled"] += 1
+                except Exception as e:
+                    self._status["failed"] += 1
+                    logger.warning(f"预填充失败 {query}: {str(e)}")
+
+        await asyncio.gather(*(prefill(query) for query in queries))
+
+    def status(self) -> Dict[str, object]:
+        return {"ready": self.ready, **self._status}
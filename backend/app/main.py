@@ -1,10 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
+from app.api import endpoints
 from app.api.endpoints import router as api_router
+from app.core.logging_pipeline import DebugSamplingMiddleware
+from app.core.metrics import metrics
+from app.core.warmup import Warmup
+import asyncio
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="ECloud Search API",
     description="移动云帮助中心搜索服务",
@@ -40,4 +48,37 @@ async def root():
     </html>
     """
 
-app.include_router(api_router, prefix="/api")
\ No newline at end of file
+# 按请求抽样输出 DEBUG 日志，其余请求只记录 ECLOUD_LOG_LEVEL 及以上级别
+app.add_middleware(DebugSamplingMiddleware)
+
+app.include_router(api_router, prefix="/api")
+
+@app.on_event("startup")
+async def startup():
+    """提前创建搜索器，在后台预热浏览器池和缓存（完成前 /api/ready 返回 503）并启动后台刷新"""
+    searcher = endpoints.get_searcher()
+    endpoints.warmup = Warmup.from_env(searcher)
+    app.state.warmup_task = asyncio.create_task(endpoints.warmup.run())
+    # 按预算提前刷新即将过期的热门查询
+    app.state.refresh_task = asyncio.create_task(searcher.refresher.run())
+
+@app.on_event("shutdown")
+async def shutdown():
+    """停止预热和后台刷新，并关闭浏览器池、缓存等资源"""
+    for name in ("warmup_task", "refresh_task"):
+        task = getattr(app.state, name, None)
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    if endpoints.searcher is not None:
+        await endpoints.searcher.close()
+        endpoints.searcher = None
+    logger.info("ECloud Search API shut down")
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus 文本格式的指标"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,179 @@
+"""打分引擎微基准：逐条 _calculate_similarity（旧实现）对比 BatchScorer
+
+中文查询的分差主要来自加权词匹配：旧实现按空格分词，中文词几乎不会命中，
+BatchScorer 按连续中文字符段做子串匹配。其余维度与旧实现一致或近似。
+
+运行方式（在 backend 目录下）:
+    python -m benchmarks.bench_scoring
+    python -m benchmarks.bench_scoring --json
+"""
+import argparse
+import json
+import random
+import time
+from difflib import SequenceMatcher
+from typing import List, Tuple
+
+from app.core.models import SearchResult
+from app.core.scoring import BatchScorer
+
+QUERY = "云主机系统盘 最大配置容量"
+
+_VOCAB = [
+    "云主机", "系统盘", "数据盘", "最大", "配置", "容量", "扩容", "快照", "镜像", "实例",
+    "规格", "网络", "安全组", "弹性公网IP", "带宽", "计费", "按需", "包年包月", "操作步骤",
+    "注意事项", "控制台", "单击", "选择", "支持", "GB", "TB", "ssd", "vpc", "api", "，", "。",
+]
+
+
+def legacy_similarity(query: str, text: str) -> float:
+    """旧版 _calculate_similarity 的逐字拷贝（去掉日志），作为对照基线"""
+    if not text:
+        return 0.0
+
+    query = query.lower().strip()
+    text = text.lower().strip()
+
+    exact_match_score = 1.0 if query in text else 0.0
+
+    query_words = set(query.split())
+    text_words = set(text.split())
+
+    word_weights = {}
+    for word in query_words:
+        word_count = text.count(word)
+        length_boost = len(word) / len(max(query_words, key=len))
+        word_weights[word] = (1 + (0.5 * word_count)) * length_boost
+
+    common_words = query_words & text_words
+    weighted_matches = sum(word_weights.get(word, 0) for word in common_words)
+    total_weight = sum(word_weights.values()) or 1
+    tfidf_score = weighted_matches / total_weight
+
+    sequence_score = SequenceMatcher(None, query, text).ratio()
+
+    def get_ngrams(text: str, n: int) -> set:
+        return set(text[i:i+n] for i in range(len(text)-n+1))
+
+    query_bigrams = get_ngrams(query, 2)
+    text_bigrams = get_ngrams(text, 2)
+    query_trigrams = get_ngrams(query, 3)
+    text_trigrams = get_ngrams(text, 3)
+
+    bigram_similarity = (
+        len(query_bigrams & text_bigrams) /
+        (len(query_bigrams | text_bigrams) or 1)
+    )
+    trigram_similarity = (
+        len(query_trigrams & text_trigrams) /
+        (len(query_trigrams | text_trigrams) or 1)
+    )
+    ngram_score = (bigram_similarity + trigram_similarity) / 2
+
+    final_score = (
+        exact_match_score * 0.20 +
+        tfidf_score * 0.35 +
+        sequence_score * 0.25 +
+        ngram_score * 0.20
+    )
+
+    length_ratio = min(len(text) / len(query), 5.0) / 5.0
+    final_score *= (0.8 + 0.2 * length_ratio)
+    return final_score
+
+
+def legacy_rank(query: str, results: List[SearchResult]) -> List[SearchResult]:
+    for result in results:
+        title_score = legacy_similarity(query, result.title)
+        content_score = legacy_similarity(query, result.content)
+        content_length = len(result.content)
+        if content_length < 50:
+            content_weight = 0.2
+        elif content_length > 500:
+            content_weight = 0.4
+        else:
+            content_weight = 0.3
+        result.score = title_score * (1 - content_weight) + content_score * content_weight
+    results.sort(key=lambda x: x.score, reverse=True)
+    return results
+
+
+def make_candidates(count: int, content_chars: int, seed: int = 7) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    candidates = []
+    for i in range(count):
+        title = "".join(rng.choice(_VOCAB) for _ in range(rng.randint(3, 8)))
+        words = []
+        while sum(len(w) for w in words) < content_chars:
+            words.append(rng.choice(_VOCAB))
+        candidates.append((f"{title}{i}", "".join(words)))
+    return candidates
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(
+    sizes=(10, 50, 100),
+    content_chars: int = 5000,
+    repeat: int = 3,
+    query: str = QUERY,
+) -> List[dict]:
+    rows = []
+    for size in sizes:
+        candidates = make_candidates(size, content_chars)
+
+        def build():
+            return [SearchResult(title, content, "") for title, content in candidates]
+
+        legacy = legacy_rank(query, build())
+        batch = BatchScorer(query).rank(build())
+        legacy_scores = {r.title: r.score for r in legacy}
+        diffs = [abs(r.score - legacy_scores[r.title]) for r in batch]
+
+        legacy_time = _time(lambda: legacy_rank(query, build()), repeat)
+        batch_time = _time(lambda: BatchScorer(query).rank(build()), repeat)
+        rows.append({
+            "candidates": size,
+            "content_chars": content_chars,
+            "legacy_ms": legacy_time * 1000,
+            "batch_ms": batch_time * 1000,
+            "speedup": legacy_time / batch_time if batch_time else float("inf"),
+            "max_score_diff": max(diffs),
+            "mean_score_diff": sum(diffs) / len(diffs),
+            "same_top1": legacy[0].title == batch[0].title,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="打分引擎微基准")
+    parser.add_argument("--sizes", default="10,50,100", help="候选数量，逗号分隔")
+    parser.add_argument("--content-chars", type=int, default=5000, help="每条候选内容的字符数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--query", default=QUERY, help="查询词")
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    rows = run(sizes, args.content_chars, args.repeat, args.query)
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+
+    print(f"{'候选数':>6} {'旧实现ms':>10} {'批量ms':>10} {'加速比':>8} {'最大分差':>10} {'Top1一致':>8}")
+    for row in rows:
+        print(
+            f"{row['candidates']:>6} {row['legacy_ms']:>10.1f} {row['batch_ms']:>10.1f} "
+            f"{row['speedup']:>8.1f} {row['max_score_diff']:>10.4f} {str(row['same_top1']):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
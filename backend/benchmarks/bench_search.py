@@ -0,0 +1,333 @@
+"""端到端性能基准：在本地替身服务上压测搜索链路，不访问真实站点
+
+场景：
+    similarity   _calculate_similarity 单条打分
+    search_cold  ECloudSearcher.search，全部未命中缓存
+    search_hot   ECloudSearcher.search，全部命中缓存
+    best_answer  get_best_answer（含段落级答案提取）
+    api_search   POST /api/search（进程内 ASGI 调用）
+
+每个场景报告吞吐、总延迟和各阶段（metrics.span）的 p50/p95/p99，以及进程峰值 RSS。
+替身服务运行在独立进程中，不计入 RSS。默认走 HTTP 搜索后端；--backend playwright
+需要本机已安装 Chromium。
+
+运行方式（在 backend 目录下）:
+    python -m benchmarks.bench_search
+    python -m benchmarks.bench_search --requests 200 --concurrency 16 --latency-ms 80 --json out.json
+    python -m benchmarks.bench_search --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.bench_scoring import make_candidates
+from benchmarks.fixture_server import serve
+
+SCENARIOS = ("similarity", "search_cold", "search_hot", "best_answer", "api_search")
+QUERIES = ["云主机系统盘 最大配置容量", "弹性公网IP 带宽", "快照 镜像", "安全组 规则", "vpc 网络"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else 0.0,
+    }
+
+
+def parse_server_timing(header: str) -> List[tuple]:
+    """把 "stage;dur=12.3, ..." 解析为 [(阶段, 秒)]"""
+    timings = []
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.startswith("dur="):
+            timings.append((name, float(params[4:]) / 1000))
+    return timings
+
+
+def peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB，macOS 上为字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+async def drive(
+    operation: Callable[[int], Awaitable[Optional[list]]], requests: int, concurrency: int
+) -> Dict[str, object]:
+    """以固定并发执行 operation(i)，收集总延迟和各阶段耗时
+
+    operation 可以返回额外的 [(阶段, 秒)]，用于无法共享上下文的场景（如解析 Server-Timing）。
+    """
+    from app.core.metrics import collect_timings
+
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int):
+        nonlocal errors
+        async with semaphore:
+            with collect_timings() as timings:
+                start = time.perf_counter()
+                try:
+                    timings.extend(await operation(index) or [])
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+            per_stage: Dict[str, float] = {}
+            for stage, elapsed in timings:
+                per_stage[stage] = per_stage.get(stage, 0.0) + elapsed
+            for stage, elapsed in per_stage.items():
+                stages.setdefault(stage, []).append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_s": wall,
+        "throughput_rps": requests / wall if wall else 0.0,
+        "latency": summarize(latencies),
+        "stages": {stage: summarize(samples) for stage, samples in sorted(stages.items())},
+    }
+
+
+def _configure_env(base_url: str, backend: str, index_dir: str):
+    # 必须在导入 app 模块之前设置，部分配置在导入时读取
+    os.environ["ECLOUD_BASE_URL"] = base_url
+    os.environ["ECLOUD_INDEX_DIR"] = index_dir
+    os.environ.pop("ECLOUD_CACHE_DISK_PATH", None)
+    os.environ.pop("ECLOUD_CACHE_SHARED", None)
+    if backend == "http":
+        os.environ["ECLOUD_SEARCH_API_URL"] = "/api/search"
+    else:
+        os.environ.pop("ECLOUD_SEARCH_API_URL", None)
+
+
+async def run_scenarios(
+    scenarios, requests: int, concurrency: int, content_chars: int
+) -> Dict[str, dict]:
+    from httpx import ASGITransport, AsyncClient
+
+    from app.api import endpoints
+    from app.main import app
+    from app.core.scraper.search_automation import ECloudSearcher
+
+    # 压测查询不写入 search_automation.log，避免影响基于日志的预热
+    logging.getLogger('ecloud_searcher').setLevel(logging.WARNING)
+
+    results: Dict[str, dict] = {}
+    searcher = ECloudSearcher()
+    endpoints.searcher = searcher
+    try:
+        if "similarity" in scenarios:
+            candidates = make_candidates(64, content_chars)
+
+            async def similarity(i: int):
+                title, content = candidates[i % len(candidates)]
+                searcher._calculate_similarity(QUERIES[i % len(QUERIES)], content)
+
+            results["similarity"] = await drive(similarity, requests, 1)
+
+        if "search_cold" in scenarios or "search_hot" in scenarios:
+            cold_queries = [f"{QUERIES[i % len(QUERIES)]} {i}" for i in range(requests)]
+
+            async def search_cold(i: int):
+                await searcher.search(cold_queries[i])
+
+            cold = await drive(search_cold, requests, concurrency)
+            if "search_cold" in scenarios:
+                results["search_cold"] = cold
+            if "search_hot" in scenarios:
+                results["search_hot"] = await drive(search_cold, requests, concurrency)
+
+        if "best_answer" in scenarios:
+            async def best_answer(i: int):
+                await searcher.get_best_answer(f"{QUERIES[i % len(QUERIES)]} 答案 {i}")
+
+            results["best_answer"] = await drive(best_answer, requests, concurrency)
+
+        if "api_search" in scenarios:
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url="http://bench") as client:
+                async def api_search(i: int):
+                    response = await client.post(
+                        "/api/search", json={"query": f"{QUERIES[i % len(QUERIES)]} api {i}"}
+                    )
+                    response.raise_for_status()
+                    return parse_server_timing(response.headers.get("server-timing", ""))
+
+                results["api_search"] = await drive(api_search, requests, concurrency)
+    finally:
+        await searcher.close()
+        endpoints.searcher = None
+    return results
+
+
+def run(
+    scenarios=SCENARIOS,
+    requests: int = 100,
+    concurrency: int = 8,
+    latency_ms: float = 50,
+    results_per_query: int = 10,
+    paragraphs: int = 8,
+    content_chars: int = 5000,
+    backend: str = "http",
+) -> dict:
+    port = _free_port()
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve, args=(port, latency_ms, results_per_query, paragraphs, ready), daemon=True
+    )
+    server.start()
+    ready.wait(10)
+    try:
+        with tempfile.TemporaryDirectory() as index_dir:
+            _configure_env(f"http://127.0.0.1:{port}", backend, index_dir)
+            scenario_results = asyncio.run(
+                run_scenarios(scenarios, requests, concurrency, content_chars)
+            )
+    finally:
+        server.terminate()
+        server.join()
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "latency_ms": latency_ms,
+            "results_per_query": results_per_query,
+            "paragraphs": paragraphs,
+            "backend": backend,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "scenarios": scenario_results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> List[str]:
+    """对比两次运行，正数表示变慢（延迟）或变快（吞吐）的百分比"""
+    lines = [f"对比基线 {baseline.get('commit') or '?'} -> {current.get('commit') or '?'}"]
+    for name, row in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        lines.append(
+            f"{name:>12} 吞吐 {_delta(row['throughput_rps'], base['throughput_rps']):>8} "
+            f"p50 {_delta(row['latency']['p50_ms'], base['latency']['p50_ms']):>8} "
+            f"p95 {_delta(row['latency']['p95_ms'], base['latency']['p95_ms']):>8} "
+            f"p99 {_delta(row['latency']['p99_ms'], base['latency']['p99_ms']):>8}"
+        )
+    lines.append(
+        f"{'peak_rss':>12} {_delta(current['peak_rss_mb'], baseline.get('peak_rss_mb', 0.0)):>8}"
+    )
+    return lines
+
+
+def _delta(value: float, base: float) -> str:
+    if not base:
+        return "n/a"
+    return f"{(value - base) / base * 100:+.1f}%"
+
+
+def print_report(report: dict):
+    print(
+        f"commit {report['commit'] or '?'}  峰值 RSS {report['peak_rss_mb']:.1f} MB  "
+        f"配置 {json.dumps(report['config'], ensure_ascii=False)}"
+    )
+    print(f"{'场景':>12} {'吞吐/s':>9} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'错误':>5}")
+    for name, row in report["scenarios"].items():
+        latency = row["latency"]
+        print(
+            f"{name:>12} {row['throughput_rps']:>9.1f} {latency['p50_ms']:>9.2f} "
+            f"{latency['p95_ms']:>9.2f} {latency['p99_ms']:>9.2f} {row['errors']:>5}"
+        )
+        for stage, stats in row["stages"].items():
+            print(
+                f"{'':>12}   {stage:<22} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                f"{stats['p99_ms']:>9.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端搜索性能基准")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="场景，逗号分隔")
+    parser.add_argument("--requests", type=int, default=100, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50, help="替身服务每个请求的延迟")
+    parser.add_argument("--results", type=int, default=10, help="每次搜索返回的结果数")
+    parser.add_argument("--paragraphs", type=int, default=8, help="每篇文章的段落数")
+    parser.add_argument("--content-chars", type=int, default=5000, help="similarity 场景的文本长度")
+    parser.add_argument("--backend", choices=("http", "playwright"), default="http")
+    parser.add_argument("--json", metavar="PATH", help="把结果写入 JSON 文件（- 表示标准输出）")
+    parser.add_argument("--compare", metavar="PATH", help="与之前保存的 JSON 结果对比")
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知场景: {', '.join(sorted(unknown))}")
+
+    report = run(
+        scenarios, args.requests, args.concurrency, args.latency_ms,
+        args.results, args.paragraphs, args.content_chars, args.backend,
+    )
+    if args.json == "-":
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("\n".join(compare(report, baseline)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""本地帮助中心替身服务，供基准测试使用，不访问真实站点
+
+提供与线上相同路径的三类页面：
+    /op-help-center/search-engine/search/?q=...   搜索结果页（浏览器后端）
+    /api/search?q=...&size=...                    JSON 搜索接口（HTTP 后端）
+    /op-help-center/doc/article/<id>              文章页，支持 ETag 条件请求
+    /static/<name>                                搜索页引用的样式、图片、字体（assets=True 时）
+
+内容由固定种子生成，同一查询每次返回相同结果，保证多次运行可比。
+
+运行方式（在 backend 目录下）:
+    python -m benchmarks.fixture_server --port 8765 --latency-ms 50 --results 10
+"""
+import argparse
+import hashlib
+import html
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.bench_scoring import _VOCAB
+
+SEARCH_PATH = "/op-help-center/search-engine/search/"
+API_PATH = "/api/search"
+ARTICLE_PATH = "/op-help-center/doc/article/"
+STATIC_PATH = "/static/"
+ARTICLE_COUNT = 2000
+
+
+def _rng(*parts) -> random.Random:
+    seed = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return "".join(rng.choice(_VOCAB) for _ in range(words))
+
+
+def article_content(article_id: int, paragraphs: int) -> Tuple[str, List[str]]:
+    rng = _rng("article", article_id)
+    title = _sentence(rng, rng.randint(3, 6))
+    body = [_sentence(rng, rng.randint(20, 60)) for _ in range(paragraphs)]
+    return title, body
+
+
+def search_hits(query: str, count: int, paragraphs: int) -> List[dict]:
+    rng = _rng("search", query.lower().strip())
+    hits = []
+    for article_id in rng.sample(range(1, ARTICLE_COUNT), count):
+        title, body = article_content(article_id, paragraphs)
+        # 摘要里混入查询词，让打分结果有区分度
+        snippet = body[0][:60] + query + body[-1][:60]
+        hits.append({"articleId": article_id, "title": title, "content": snippet})
+    return hits
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    latency = 0.05
+    results = 10
+    paragraphs = 8
+    # 搜索页是否引用静态资源和第三方脚本，用于检查快速加载模式的拦截
+    assets = False
+    protocol_version = "HTTP/1.1"
+    # 头部和正文分两次写出，关闭 Nagle 避免与延迟 ACK 叠加出额外的 40ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        query = params.get("q", [""])[0]
+
+        if url.path == API_PATH:
+            size = int(params.get("size", [self.results])[0])
+            hits = search_hits(query, min(size, self.results), self.paragraphs) if query else []
+            self._send(200, json.dumps({"data": {"list": hits}}, ensure_ascii=False), "application/json")
+        elif url.path.rstrip("/") == SEARCH_PATH.rstrip("/"):
+            self._send(200, self._search_page(query), "text/html")
+        elif url.path.startswith(ARTICLE_PATH):
+            self._article(url.path[len(ARTICLE_PATH):])
+        elif url.path.startswith(STATIC_PATH):
+            self.requested_assets.append(url.path)
+            self._send(200, "", "text/plain")
+        else:
+            self._send(404, "not found", "text/plain")
+
+    def _search_page(self, query: str) -> str:
+        hits = search_hits(query, self.results, self.paragraphs) if query else []
+        if not hits:
+            return "<html><body><div class='no-result'>暂无结果</div></body></html>"
+        items = "".join(
+            f"<div class='search-result-item'><h3><a href='{ARTICLE_PATH}{hit['articleId']}'>"
+            f"{html.escape(hit['title'])}</a></h3><p class='summary'>{html.escape(hit['content'])}</p></div>"
+            for hit in hits
+        )
+        head = "<title>搜索</title>"
+        if self.assets:
+            # 第三方主机用 localhost 指回本服务，被放行时能在 requested_assets 中看到
+            port = self.server.server_address[1]
+            head += (
+                f"<link rel='stylesheet' href='{STATIC_PATH}app.css'>"
+                f"<style>@font-face {{font-family: f; src: url('{STATIC_PATH}font.woff2')}} "
+                f"body {{font-family: f}}</style>"
+                f"<script src='http://localhost:{port}{STATIC_PATH}tracker.js'></script>"
+            )
+            items += f"<img src='{STATIC_PATH}logo.png'>"
+        return f"<html><head>{head}</head><body><div class='search-list'>{items}</div></body></html>"
+
+    def _article(self, article_id: str):
+        if not article_id.isdigit():
+            self._send(404, "not found", "text/plain")
+            return
+        title, body = article_content(int(article_id), self.paragraphs)
+        etag = f'"{article_id}-v1"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        paragraphs = "".join(f"<p>{html.escape(p)}</p>" for p in body)
+        page = (
+            f"<html><head><title>{html.escape(title)}</title></head>"
+            f"<body><h1>{html.escape(title)}</h1><article>{paragraphs}</article></body></html>"
+        )
+        self._send(200, page, "text/html", {"ETag": etag})
+
+    def _send(self, status: int, text: str, content_type: str, headers: dict = None):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(
+    port: int, latency_ms: float = 50, results: int = 10, paragraphs: int = 8, assets: bool = False
+) -> ThreadingHTTPServer:
+    """port 为 0 时由系统分配端口；已请求的静态资源路径记录在 server.RequestHandlerClass.requested_assets"""
+    handler = type("Handler", (FixtureHandler,), {
+        "latency": latency_ms / 1000,
+        "results": results,
+        "paragraphs": paragraphs,
+        "assets": assets,
+        "requested_assets": [],
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(port: int, latency_ms: float = 50, results: int = 10, paragraphs: int = 8, ready=None):
+    server = make_server(port, latency_ms, results, paragraphs)
+    if ready is not None:
+        ready.set()
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地帮助中心替身服务")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50, help="每个请求的固定延迟")
+    parser.add_argument("--results", type=int, default=10, help="每次搜索返回的结果数")
+    parser.add_argument("--paragraphs", type=int, default=8, help="每篇文章的段落数")
+    args = parser.parse_args()
+    print(f"替身服务: http://127.0.0.1:{args.port}")
+    serve(args.port, args.latency_ms, args.results, args.paragraphs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""段落级答案提取：超出请求预算时返回排序结果，抓取在后台继续写入文章缓存"""
+import asyncio
+import time
+
+from app.core.answer_extraction import AnswerExtractor, ArticleFetcher, CachedArticle
+from app.core.models import SearchResult
+
+URL = "https://ecloud.10086.cn/op-help-center/doc/article/1"
+
+
+class SlowFetcher(ArticleFetcher):
+    async def _fetch(self, url, cached):
+        await asyncio.sleep(0.2)
+        article = CachedArticle(url=url, title="云硬盘扩容", paragraphs=["云硬盘支持在线扩容，无需停机。"],
+                                checked_at=time.time())
+        self._articles[url] = article
+        return article
+
+
+def test_extraction_respects_request_deadline():
+    async def run():
+        extractor = AnswerExtractor(SlowFetcher())
+        results = [SearchResult(title="云硬盘", content="搜索摘要", url=URL, score=1.0)]
+
+        answered = await extractor.apply("云硬盘扩容", results, time.monotonic() + 0.05)
+        assert answered == results
+        assert extractor.stats()["budget_timeouts"] == 1
+
+        # 超时没有取消抓取，下次请求直接用缓存中的文章
+        await asyncio.sleep(0.3)
+        answered = await extractor.apply("云硬盘扩容", results, time.monotonic() + 0.05)
+        assert answered[0].content == "云硬盘支持在线扩容，无需停机。"
+
+        assert await extractor.apply("云硬盘扩容", results, time.monotonic() - 1) == results
+        assert extractor.stats()["budget_skipped"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,30 @@
+"""共享磁盘层：其他进程持有写锁时不阻塞事件循环"""
+import sqlite3
+import time
+
+from app.core.cache import ResultCache
+
+
+def test_locked_disk_tier_is_skipped(tmp_path):
+    path = str(tmp_path / "results.db")
+    cache = ResultCache(disk_path=path, shared=True, busy_timeout=0.05)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.monotonic()
+        cache.set("q", ["answer"], ttl=60)
+        assert cache.try_claim("q", 30)
+        assert time.monotonic() - start < 1.0
+        assert cache.stats()["disk_busy"] == 2
+        # 内存层照常可用
+        assert cache.get("q") == ["answer"]
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+
+    # 锁释放后磁盘层恢复写入
+    cache.set("q2", ["answer"], ttl=60)
+    peer = ResultCache(disk_path=path, shared=True)
+    assert peer.get("q2") == ["answer"]
+    cache.close()
+    peer.close()
@@ -0,0 +1,47 @@
+"""本地索引作答：没有匹配词项时回退到在线搜索，而不是抛出异常"""
+import pytest
+
+from app.core.indexer import IndexBuilder, LocalIndex, index_terms
+from app.core.scraper.search_automation import ECloudSearcher
+
+BODY = "云主机系统盘最大容量为 1TB，数据盘最多挂载 8 块。"
+
+
+@pytest.fixture
+def searcher(tmp_path):
+    index_dir = str(tmp_path / "index")
+    IndexBuilder(index_dir).write(
+        [{"id": "1", "url": "https://example.com/1", "title": "云主机磁盘容量", "hash": ""}],
+        {"1": BODY},
+        {"1": dict(index_terms(BODY))},
+    )
+    searcher = ECloudSearcher()
+    searcher.local_index = LocalIndex.load(index_dir)
+    return searcher
+
+
+def test_unmatched_query_falls_back(searcher):
+    assert searcher.local_index.search("hello world") == []
+    assert searcher._search_local("hello world") is None
+    assert searcher.search_stats["local_fallbacks"] == 1
+
+
+def test_matched_query_is_answered(searcher):
+    searcher.local_min_confidence = 0.0
+    results = searcher._search_local("云主机系统盘最大容量")
+    assert results and results[0].url == "https://example.com/1"
+    assert searcher.search_stats["local_answers"] == 1
+
+
+def test_single_character_query_term_matches(tmp_path):
+    body = "云硬盘扩容后需要在云主机内扩展文件系统。"
+    index_dir = str(tmp_path / "index")
+    IndexBuilder(index_dir).write(
+        [{"id": "7", "url": "https://example.com/7", "title": "云硬盘扩容", "hash": ""}],
+        {"7": body},
+        {"7": dict(index_terms(body))},
+    )
+    index = LocalIndex.load(index_dir)
+    results = index.search("盘 扩容")
+    assert [r.url for r in results] == ["https://example.com/7"]
+    assert index.search("盘")
@@ -0,0 +1,31 @@
+"""近似查询索引：否定词或数字不同的问题不能复用彼此的答案"""
+import pytest
+
+from app.core.normalization import NearDuplicateIndex, normalize_query
+
+
+@pytest.mark.parametrize("cached, query", [
+    ("云主机可以挂载云硬盘", "云主机不可以挂载云硬盘"),
+    ("云硬盘支持在线扩容", "云硬盘不支持在线扩容"),
+])
+def test_negated_query_is_not_near_duplicate(cached, query):
+    index = NearDuplicateIndex()
+    index.add(normalize_query(cached))
+    assert index.find(normalize_query(query)) is None
+    # 反过来也一样
+    index = NearDuplicateIndex()
+    index.add(normalize_query(query))
+    assert index.find(normalize_query(cached)) is None
+
+
+def test_same_negation_still_matches():
+    index = NearDuplicateIndex()
+    index.add(normalize_query("云硬盘不支持在线扩容"))
+    match = index.find(normalize_query("云硬盘不支持在线的扩容"))
+    assert match is not None and match[0] == "云硬盘不支持在线扩容"
+
+
+def test_different_digits_are_not_near_duplicate():
+    index = NearDuplicateIndex()
+    index.add(normalize_query("2核4G云主机价格"))
+    assert index.find(normalize_query("4核4G云主机价格")) is None
@@ -0,0 +1,57 @@
+"""快速加载模式对本地替身服务的检查：非必要资源和第三方请求被拦截，结果选择器照常出现"""
+import asyncio
+import threading
+
+import pytest
+
+from app.core.scraper.page_loader import PageLoader
+from benchmarks.fixture_server import SEARCH_PATH, make_server
+
+async_playwright = pytest.importorskip("playwright.async_api").async_playwright
+
+
+@pytest.fixture
+def fixture_server():
+    server = make_server(0, latency_ms=0, results=3, assets=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+async def _fast_load(url: str):
+    loader = PageLoader(fast=True, allowed_hosts=["127.0.0.1"])
+    async with async_playwright() as playwright:
+        try:
+            browser = await playwright.chromium.launch(headless=True)
+        except Exception as e:
+            pytest.skip(f"Chromium 不可用: {e}")
+        try:
+            page = await browser.new_page()
+            stats = await loader.load(page, url, timeout=10000)
+            count = await page.locator(".search-result-item").count()
+        finally:
+            await browser.close()
+    return stats, count
+
+
+def test_fast_load_blocks_assets_and_third_party(fixture_server):
+    port = fixture_server.server_address[1]
+    stats, count = asyncio.run(_fast_load(f"http://127.0.0.1:{port}{SEARCH_PATH}?q=云主机"))
+
+    assert stats.matched_selector
+    assert count == 3
+    assert stats.blocked_by_type.get("stylesheet") == 1
+    assert stats.blocked_by_type.get("image") == 1
+    assert stats.third_party_blocked == 1
+    # 被拦截的请求都没有到达服务端
+    assert fixture_server.RequestHandlerClass.requested_assets == []
+
+
+def test_wait_selectors_skip_generic_wrappers():
+    # 外层容器 / 骨架屏（如 search-result-wrapper、empty-placeholder）不能让快速模式提前返回
+    selectors = PageLoader(fast=True).wait_selectors
+    assert "div[class*='result']" not in selectors
+    assert "[class*='empty']" not in selectors
+    assert ".search-result-item" in selectors and ".no-result" in selectors
@@ -0,0 +1,130 @@
+"""后台定时刷新：共享缓存中结果仍新鲜时也要真正重新抓取，未写入结果时不重复消耗预算"""
+import asyncio
+import time
+
+from app.core.models import SearchResult
+from app.core.scraper.backends import SearchBackend
+from app.core.scraper.search_automation import ECloudSearcher
+
+
+class CountingBackend(SearchBackend):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def search(self, query, max_results, timeout=None):
+        self.calls += 1
+        return [SearchResult(title=f"{query} 结果", content=f"{query} 说明", url="", score=0.0)]
+
+
+def _searcher(monkeypatch, tmp_path, backend):
+    monkeypatch.setenv("ECLOUD_CACHE_SHARED", "1")
+    monkeypatch.setenv("ECLOUD_CACHE_DISK_PATH", str(tmp_path / "results.db"))
+    monkeypatch.setenv("ECLOUD_ANSWER_TOP_K", "0")
+    searcher = ECloudSearcher(backends=[backend])
+    searcher.local_index = None
+    return searcher
+
+
+def test_scheduled_refresh_scrapes_fresh_shared_entry(monkeypatch, tmp_path):
+    backend = CountingBackend()
+    searcher = _searcher(monkeypatch, tmp_path, backend)
+    refresher = searcher.refresher
+
+    async def run():
+        key = searcher._get_cache_key("云主机系统盘容量")
+        await searcher.search("云主机系统盘容量")
+        for _ in range(5):
+            await searcher.search("云主机系统盘容量")
+        assert backend.calls == 1
+
+        for _ in range(2):
+            refresher._keys[key].expires_at = time.time() + 1
+            await refresher.tick()
+        assert backend.calls == 3
+        assert refresher.stats()["refreshes"] == 2
+        assert refresher.stores(key) == 3
+        await searcher.close()
+
+    asyncio.run(run())
+
+
+def test_refresh_without_store_is_deferred(monkeypatch, tmp_path):
+    backend = CountingBackend()
+    searcher = _searcher(monkeypatch, tmp_path, backend)
+    refresher = searcher.refresher
+
+    async def no_store(cache_key, query):
+        return False
+
+    async def run():
+        key = searcher._get_cache_key("对象存储计费")
+        await searcher.search("对象存储计费")
+        for _ in range(5):
+            await searcher.search("对象存储计费")
+        refresher._refresh = no_store
+        refresher._keys[key].expires_at = time.time() + 1
+        tokens = refresher._tokens
+        await refresher.tick()
+        await refresher.tick()
+        # 第一次未刷新后推迟到最小 TTL 之后，第二轮不再到期
+        assert refresher.stats()["refreshes"] == 0
+        assert refresher.stats()["refresh_failures"] == 1
+        assert refresher._keys[key].expires_at >= time.time() + refresher.min_ttl - 5
+        assert tokens - refresher._tokens < 2
+        await searcher.close()
+
+    asyncio.run(run())
+
+
+def _stored_by_both(monkeypatch, tmp_path, query):
+    """两个 worker 共享同一个磁盘层，先后写入同一查询，第二个写入的结果更新"""
+    first_backend, second_backend = CountingBackend(), CountingBackend()
+    first = _searcher(monkeypatch, tmp_path, first_backend)
+    second = _searcher(monkeypatch, tmp_path, second_backend)
+    key = first._get_cache_key(query)
+    results = [SearchResult(title=f"{query} 结果", content=f"{query} 说明", url="", score=0.0)]
+    first._store_results(key, results, query)
+    time.sleep(0.01)
+    second._store_results(key, results, query)
+    return first, first_backend, second, key
+
+
+def test_refresh_adopts_peer_result(monkeypatch, tmp_path):
+    first, backend, second, key = _stored_by_both(monkeypatch, tmp_path, "云硬盘快照")
+    refresher = first.refresher
+
+    async def run():
+        for _ in range(5):
+            await first.search("云硬盘快照")
+        refresher._keys[key].expires_at = time.time() + 1
+        tokens = refresher._tokens
+        await refresher.tick()
+        # 另一个 worker 写入了更新的结果：沿用它的过期时间，不抓取也不消耗令牌
+        assert backend.calls == 0
+        assert refresher.stats()["peer_refreshes"] == 1
+        assert refresher._keys[key].expires_at > time.time() + 3600
+        assert refresher._tokens >= tokens
+        await first.close()
+        await second.close()
+
+    asyncio.run(run())
+
+
+def test_idle_eviction_keeps_peer_row(monkeypatch, tmp_path):
+    first, _, second, key = _stored_by_both(monkeypatch, tmp_path, "弹性公网IP")
+    stats = first.refresher._keys[key]
+    stats.expires_at = time.time() - 1
+    stats.last_hit = time.time() - stats.ttl - 1
+
+    async def run():
+        await first.refresher.tick()
+        assert first.refresher.stats()["idle_evictions"] == 1
+        assert key not in first.cache.keys()
+        # 另一个 worker 之后写入的记录仍在共享磁盘层中
+        assert first.cache.get(key) is not None
+        await first.close()
+        await second.close()
+
+    asyncio.run(run())
@@ -0,0 +1,40 @@
+"""GET /api/search 的缓存头：近似查询命中的答案按所复用条目的剩余有效期设置 max-age"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.core.models import SearchResult
+from app.core.scraper.backends import SearchBackend
+from app.core.scraper.search_automation import ECloudSearcher
+
+
+class StaticBackend(SearchBackend):
+    name = "static"
+
+    async def search(self, query, max_results, timeout=None):
+        return [SearchResult(title="云硬盘在线扩容", content="云硬盘支持在线扩容", url="", score=0.0)]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("ECLOUD_ANSWER_TOP_K", "0")
+    monkeypatch.setattr(endpoints, "LOCAL_ANSWER_MAX_AGE", 7)
+    searcher = ECloudSearcher(backends=[StaticBackend()])
+    searcher.local_index = None
+    monkeypatch.setattr(endpoints, "searcher", searcher)
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_near_duplicate_answer_uses_matched_entry_freshness(client):
+    exact = client.get("/api/search", params={"q": "云硬盘支持在线扩容吗"})
+    assert exact.status_code == 200
+    near = client.get("/api/search", params={"q": "云硬盘支持在线的扩容"})
+    assert near.status_code == 200
+    assert endpoints.searcher.search_stats["near_duplicate_hits"] == 1
+    # 不是本地索引的固定 max-age，而是所复用条目的剩余有效期（自适应 TTL，至少 1 小时）
+    max_age = int(near.headers["Cache-Control"].split("max-age=")[1].split(",")[0])
+    assert max_age > 3000
+    assert "stale-while-revalidate" in near.headers["Cache-Control"]
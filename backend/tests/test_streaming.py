@@ -0,0 +1,61 @@
+"""流式搜索：浏览器后端在页面加载完成前先产生首个结果事件，之后不重复发送"""
+import asyncio
+import contextlib
+import time
+
+from app.core.models import SearchResult
+from app.core.scraper.backends import PlaywrightSearchBackend
+from app.core.scraper.search_automation import ECloudSearcher
+
+RESULTS = [
+    SearchResult(title=f"云主机配置 {i}", content=f"云主机配置说明 {i}", url=f"https://ecloud.10086.cn/doc/{i}")
+    for i in range(3)
+]
+
+
+class FakePool:
+    @contextlib.asynccontextmanager
+    async def lease(self):
+        yield object()
+
+    async def close(self):
+        pass
+
+
+class SlowLoader:
+    """结果容器 0.05 秒后出现，页面 0.3 秒后才加载完成"""
+
+    def __init__(self):
+        self.loaded_at = None
+
+    async def load(self, page, url, timeout):
+        await asyncio.sleep(0.3)
+        self.loaded_at = time.monotonic()
+
+    async def wait_for_results(self, page, timeout):
+        await asyncio.sleep(0.05)
+
+
+def test_first_result_is_streamed_before_page_load(monkeypatch, tmp_path):
+    monkeypatch.setenv("ECLOUD_ANSWER_TOP_K", "0")
+    loader = SlowLoader()
+
+    async def extract(page, max_results):
+        return [SearchResult(r.title, r.content, r.url) for r in RESULTS[:max_results]]
+
+    backend = PlaywrightSearchBackend(FakePool(), loader, extract, "https://ecloud.10086.cn/search", 10000)
+    searcher = ECloudSearcher(backends=[backend])
+    searcher.local_index = None
+
+    async def run():
+        events = []
+        async for name, data in searcher.search_events("云主机配置"):
+            events.append((name, data, time.monotonic()))
+        results = [(data, at) for name, data, at in events if name == "result"]
+        assert [data["url"] for data, _ in results] == [r.url for r in RESULTS]
+        assert results[0][1] < loader.loaded_at
+        assert results[0][0]["score"] > 0
+        assert events[-1][0] == "answer"
+        await searcher.close()
+
+    asyncio.run(run())